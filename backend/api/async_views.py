@@ -0,0 +1,197 @@
+"""Асинхронные версии read-only эндпоинтов для запуска под ASGI.
+
+GET-запросы обслуживаются асинхронным ORM и не занимают поток на время
+ожидания базы; остальные методы передаются синхронным вьюсетам.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django_filters.utils import translate_validation
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from config import db_router
+from recipes import counts
+from recipes.models import Follow, Ingredient, Tag
+
+from .filters import IngredientFilter, RecipeFilter
+from .serializers import (IngredientSerializer, RecipeSerializer,
+                          TagSerializer, sparse_fields)
+from .views import recipe_queryset
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status,
+        headers=headers,
+        content_type='application/json',
+    )
+
+
+def async_read_view(handler, sync_view):
+    """Обслуживает GET асинхронно, остальные методы — синхронной вьюхой."""
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        request = Request(request, authenticators=[
+            auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            user = await sync_to_async(lambda: request.user)()
+            await sync_to_async(check_throttles)(request)
+            token = None
+            if not await sync_to_async(db_router.is_pinned)(user):
+                token = db_router.use_replica()
+            try:
+                data = await handler(request, *args, **kwargs)
+            finally:
+                if token is not None:
+                    db_router.release(token)
+        except exceptions.APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (list, dict)):
+                detail = {'detail': detail}
+            if isinstance(exc, exceptions.Throttled) and exc.wait:
+                return json_response(
+                    detail,
+                    status=exc.status_code,
+                    headers={'Retry-After': str(int(exc.wait))},
+                )
+            if not isinstance(exc, exceptions.AuthenticationFailed):
+                return json_response(detail, status=exc.status_code)
+            header = request.authenticators[0].authenticate_header(request)
+            return json_response(
+                detail,
+                status=401 if header else 403,
+                headers={'WWW-Authenticate': header} if header else None,
+            )
+        return json_response(data)
+
+    # csrf_exempt в Django 4.2 не умеет оборачивать корутины.
+    view.csrf_exempt = True
+    return view
+
+
+def check_throttles(request):
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            raise exceptions.Throttled(throttle.wait())
+
+
+async def get_or_404(queryset, pk):
+    try:
+        return await queryset.aget(pk=pk)
+    except (queryset.model.DoesNotExist, ValueError):
+        raise exceptions.NotFound(
+            f'No {queryset.model._meta.object_name} matches the given query.'
+        )
+
+
+async def paginate(request, queryset):
+    """Повторяет ответ CachedCountPagination."""
+    page_size = api_settings.PAGE_SIZE
+    try:
+        number = int(request.query_params.get('page', 1))
+    except ValueError:
+        number = 0
+    count, estimated = await sync_to_async(counts.cached_count)(queryset)
+    offset = (number - 1) * page_size
+    if number < 1 or (offset and offset >= count):
+        raise exceptions.NotFound('Invalid page.')
+    items = [obj async for obj in queryset[offset:offset + page_size]]
+    if estimated and len(items) < page_size:
+        if not items and offset:
+            raise exceptions.NotFound('Invalid page.')
+        count = offset + len(items)
+    url = request.build_absolute_uri()
+    previous = None
+    if number == 2:
+        previous = remove_query_param(url, 'page')
+    elif number > 2:
+        previous = replace_query_param(url, 'page', number - 1)
+    return count, items, {
+        'next': (
+            replace_query_param(url, 'page', number + 1)
+            if offset + page_size < count else None
+        ),
+        'previous': previous,
+    }
+
+
+def filter_queryset(filterset_class, request, queryset):
+    filterset = filterset_class(
+        request.query_params, queryset=queryset, request=request
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+async def subscribed_author_ids(user, recipes, fields=None):
+    if not user.is_authenticated or (
+        fields is not None and 'author' not in fields
+    ):
+        return set()
+    return {
+        author_id async for author_id in Follow.objects.filter(
+            user_id=user.id,
+            following_id__in={recipe.author_id for recipe in recipes}
+        ).values_list('following_id', flat=True)
+    }
+
+
+async def tag_list(request):
+    return TagSerializer(
+        [tag async for tag in Tag.objects.all()], many=True
+    ).data
+
+
+async def tag_detail(request, pk):
+    return TagSerializer(await get_or_404(Tag.objects.all(), pk)).data
+
+
+async def ingredient_list(request):
+    queryset = filter_queryset(
+        IngredientFilter, request, Ingredient.objects.all()
+    )
+    return IngredientSerializer(
+        [ingredient async for ingredient in queryset], many=True
+    ).data
+
+
+async def ingredient_detail(request, pk):
+    return IngredientSerializer(
+        await get_or_404(Ingredient.objects.all(), pk)
+    ).data
+
+
+async def recipe_list(request):
+    # Фильтры могут обращаться к базе при валидации формы.
+    fields = sparse_fields(request, RecipeSerializer)
+    queryset = await sync_to_async(filter_queryset)(
+        RecipeFilter, request, recipe_queryset(request.user, fields)
+    )
+    count, recipes, links = await paginate(request, queryset)
+    serializer = RecipeSerializer(recipes, many=True, context={
+        'request': request,
+        'subscribed_ids': await subscribed_author_ids(
+            request.user, recipes, fields
+        ),
+    })
+    return {'count': count, **links, 'results': serializer.data}
+
+
+async def recipe_detail(request, pk):
+    fields = sparse_fields(request, RecipeSerializer)
+    recipe = await get_or_404(recipe_queryset(request.user, fields), pk)
+    return RecipeSerializer(recipe, context={
+        'request': request,
+        'subscribed_ids': await subscribed_author_ids(
+            request.user, [recipe], fields
+        ),
+    }).data
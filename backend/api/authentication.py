@@ -0,0 +1,77 @@
+"""Аутентификация по подписанным токенам без обращения к базе.
+
+Данные пользователя, нужные API, лежат в самом токене. Запись
+пользователя загружается из базы только если вьюха обращается к полям,
+которых в токене нет. Отозванные токены хранятся в кэше до истечения
+срока их действия.
+"""
+import time
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CLAIMS = ('email', 'username', 'first_name', 'last_name', 'is_staff')
+
+User = get_user_model()
+
+
+def revoked_key(jti):
+    return f'jwt-revoked:{jti}'
+
+
+def revoke(token):
+    """Отзывает access-токен до истечения срока его действия."""
+    timeout = max(int(token['exp'] - time.time()), 1)
+    cache.set(revoked_key(token[api_settings.JTI_CLAIM]), True, timeout)
+
+
+def is_revoked(token):
+    return cache.get(revoked_key(token[api_settings.JTI_CLAIM]), False)
+
+
+def load_user(user_id):
+    try:
+        return User.objects.get(pk=user_id, is_active=True)
+    except User.DoesNotExist:
+        raise AuthenticationFailed(
+            'Пользователь не найден.', code='user_not_found'
+        )
+
+
+class ClaimsUser(SimpleLazyObject):
+    """Пользователь, собранный из утверждений токена."""
+
+    def __init__(self, token):
+        # simplejwt хранит идентификатор строкой.
+        user_id = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+        super().__init__(partial(load_user, user_id))
+        self.__dict__.update(
+            id=user_id,
+            pk=user_id,
+            is_active=True,
+            is_authenticated=True,
+            is_anonymous=False,
+            **{claim: token.get(claim, '') for claim in USER_CLAIMS},
+        )
+
+    def __bool__(self):
+        return True
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация, не выполняющая запросов к базе."""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                'Токен не содержит идентификатор пользователя.'
+            )
+        if is_revoked(validated_token):
+            raise AuthenticationFailed('Токен отозван.', code='token_revoked')
+        return ClaimsUser(validated_token)
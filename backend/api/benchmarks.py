@@ -0,0 +1,254 @@
+"""Микробенчмарки сериализаторов и фильтров API.
+
+Фикстуры создаются в текущей базе внутри транзакции, которая в конце
+откатывается. Объекты загружаются из базы до замера, поэтому в режиме
+с предзагрузкой измеряется только сериализация, а без неё — сериализация
+вместе с запросами, которые сериализатор делает сам.
+"""
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Count
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.filters import RecipeFilter
+from api.serializers import (FollowSerializer, IngredientSerializer,
+                             RecipeSerializer, UserSerializer)
+from api.views import recipe_queryset, subscribed_author_ids
+from config.middleware import QueryTimer
+from recipes.models import (Favorite, Follow, Ingredient, Recipe,
+                            RecipeIngredient, Tag, User)
+
+RecipeTag = Recipe.tags.through
+
+TAGS_PER_RECIPE = 2
+INGREDIENTS_PER_RECIPE = 5
+RECIPES_PER_AUTHOR = 10
+
+Fixture = namedtuple('Fixture', 'reader authors tags')
+Result = namedtuple('Result', 'objects seconds queries allocated blocks')
+
+
+def build_fixture(size):
+    """Создаёт size рецептов, их авторов, теги, ингредиенты и читателя,
+    подписанного на всех авторов и добавившего половину рецептов в
+    избранное."""
+    prefix = f'bench{time.time_ns()}'
+    reader = User.objects.create(
+        email=f'{prefix}@example.com', username=prefix,
+        first_name='Bench', last_name='Reader',
+    )
+    authors = User.objects.bulk_create(
+        User(
+            email=f'{prefix}-{number}@example.com',
+            username=f'{prefix}-{number}',
+            first_name='Bench',
+            last_name=f'Author {number}',
+            avatar='users/avatars/bench.png',
+        )
+        for number in range(max(size // RECIPES_PER_AUTHOR, 1))
+    )
+    tags = Tag.objects.bulk_create(
+        Tag(name=f'{prefix} {number}', slug=f'{prefix}-{number}')
+        for number in range(TAGS_PER_RECIPE * 3)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'{prefix} {number}', measurement_unit='г')
+        for number in range(max(size, INGREDIENTS_PER_RECIPE))
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=authors[number % len(authors)],
+            name=f'Рецепт {number}',
+            text='Описание рецепта. ' * 20,
+            cooking_time=number % 120 + 1,
+            image='recipes/images/bench.png',
+        )
+        for number in range(size)
+    )
+    RecipeTag.objects.bulk_create(
+        RecipeTag(
+            recipe_id=recipe.pk,
+            tag_id=tags[(number + shift) % len(tags)].pk,
+        )
+        for number, recipe in enumerate(recipes)
+        for shift in range(TAGS_PER_RECIPE)
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[(number + shift) % len(ingredients)],
+            amount=shift + 1,
+        )
+        for number, recipe in enumerate(recipes)
+        for shift in range(INGREDIENTS_PER_RECIPE)
+    )
+    Follow.objects.bulk_create(
+        Follow(user=reader, following=author) for author in authors
+    )
+    Favorite.objects.bulk_create(
+        Favorite(user=reader, recipe=recipe) for recipe in recipes[::2]
+    )
+    return Fixture(reader, authors, tags)
+
+
+def make_request(user, path='/api/recipes/', params=None):
+    host = next(
+        (name.lstrip('.') for name in settings.ALLOWED_HOSTS
+         if '*' not in name),
+        'localhost'
+    )
+    request = Request(APIRequestFactory(
+        SERVER_NAME=host, HTTP_HOST=host
+    ).get(path, params or {}))
+    request.user = user
+    return request
+
+
+class Case:
+    """Один замер: load() загружает объекты, run(objects) — измеряемая
+    работа."""
+
+    def __init__(self, fixture, prefetch):
+        self.fixture = fixture
+        self.prefetch = prefetch
+        self.request = make_request(fixture.reader)
+
+    def load(self):
+        raise NotImplementedError
+
+    def run(self, objects):
+        raise NotImplementedError
+
+
+class RecipeCase(Case):
+    name = 'RecipeSerializer'
+
+    def load(self):
+        author_ids = [author.id for author in self.fixture.authors]
+        self.context = {'request': self.request}
+        if self.prefetch:
+            queryset = recipe_queryset(self.fixture.reader)
+        else:
+            queryset = Recipe.objects.all()
+        recipes = list(queryset.filter(author_id__in=author_ids))
+        if self.prefetch:
+            self.context['subscribed_ids'] = subscribed_author_ids(
+                self.fixture.reader, recipes
+            )
+        return recipes
+
+    def run(self, objects):
+        return RecipeSerializer(
+            objects, many=True, context=self.context
+        ).data
+
+
+class UserCase(Case):
+    name = 'UserSerializer'
+
+    def load(self):
+        self.context = {'request': self.request}
+        if self.prefetch:
+            self.context['subscribed_ids'] = set(Follow.objects.filter(
+                user_id=self.fixture.reader.id
+            ).values_list('following_id', flat=True))
+        return list(User.objects.filter(
+            id__in=[author.id for author in self.fixture.authors]
+        ))
+
+    def run(self, objects):
+        return UserSerializer(objects, many=True, context=self.context).data
+
+
+class FollowCase(Case):
+    name = 'FollowSerializer'
+
+    def load(self):
+        queryset = Follow.objects.filter(
+            user_id=self.fixture.reader.id
+        ).annotate(recipes_count=Count('following__recipes'))
+        if self.prefetch:
+            queryset = queryset.select_related('following').prefetch_related(
+                'following__recipes'
+            )
+        return list(queryset)
+
+    def run(self, objects):
+        return FollowSerializer(
+            objects, many=True, context={'request': self.request}
+        ).data
+
+
+class IngredientCase(Case):
+    name = 'IngredientSerializer'
+
+    def load(self):
+        # У ингредиента нет связей, режимы отличаются только названием.
+        return list(Ingredient.objects.filter(
+            recipes__author__in=self.fixture.authors
+        ).distinct())
+
+    def run(self, objects):
+        return IngredientSerializer(objects, many=True).data
+
+
+class RecipeFilterCase(Case):
+    """Фильтрация по тегам, автору и избранному вместе с выполнением
+    запроса; с предзагрузкой фильтруется queryset списка рецептов."""
+
+    name = 'RecipeFilter'
+
+    def load(self):
+        tags = self.fixture.tags
+        self.params = [
+            {'tags': [tags[0].slug, tags[1].slug]},
+            {'author': str(self.fixture.authors[0].id)},
+            {'is_favorited': '1', 'tags': [tags[2].slug]},
+        ]
+        return self.params
+
+    def run(self, objects):
+        found = []
+        for params in objects:
+            request = make_request(self.fixture.reader, params=params)
+            queryset = (
+                recipe_queryset(self.fixture.reader) if self.prefetch
+                else Recipe.objects.all()
+            )
+            found.extend(RecipeFilter(
+                request.query_params, queryset=queryset, request=request
+            ).qs)
+        return found
+
+
+CASES = (RecipeCase, UserCase, FollowCase, IngredientCase, RecipeFilterCase)
+
+
+def measure(case, repeat):
+    """Лучшее время из repeat прогонов, число запросов и выделенная
+    память одного прогона."""
+    best = None
+    for _ in range(repeat):
+        objects = case.load()
+        started = time.perf_counter()
+        case.run(objects)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    objects = case.load()
+    queries = QueryTimer()
+    with queries.installed():
+        case.run(objects)
+    objects = case.load()
+    tracemalloc.start()
+    try:
+        case.run(objects)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    return Result(len(objects), best, queries.count, peak, blocks)
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Бюджеты запросов и отозванные токены должны видеть все воркеры."""
+    if settings.DEBUG or settings.SHARED_CACHE:
+        return []
+    return [Warning(
+        'Кеш не общий для процессов: бюджеты CostThrottle и отозванные '
+        'токены у каждого воркера свои, а число строк списков не '
+        'кешируется.',
+        hint='Задайте CACHE_BACKEND и CACHE_LOCATION, например Redis из '
+             'docker-compose.',
+        id='api.W001',
+    )]
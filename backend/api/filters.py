@@ -1,21 +1,28 @@
 import django_filters
+from django.db.models import Case, IntegerField, Value, When
 from django_filters.rest_framework import FilterSet
 
+from recipes import pantry
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from recipes.search import search_ingredients
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
 
 
 class IngredientFilter(FilterSet):
-    """Фильтр для ингредиентов – поиск по началу названия."""
+    """Фильтр для ингредиентов – поиск по названию с опечатками."""
 
-    name = django_filters.CharFilter(
-        field_name='name',
-        lookup_expr='istartswith'
-    )
+    name = django_filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
 
+    def filter_name(self, queryset, name, value):
+        return search_ingredients(queryset, value)
+
 
 class RecipeFilter(FilterSet):
     author = django_filters.NumberFilter(field_name='author__id')
@@ -24,17 +31,20 @@ class RecipeFilter(FilterSet):
         method='filter_is_in_shopping_cart'
     )
     is_favorited = django_filters.Filter(method='filter_is_favorited')
+    have = NumberInFilter(method='filter_have')
+    missing_max = django_filters.NumberFilter(method='filter_missing_max')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'have', 'missing_max']
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if not user.is_authenticated:
             return queryset.none() if value else queryset
         favorite_ids = Favorite.objects.filter(
-            user=user
+            user_id=user.id
         ).values_list('recipe_id', flat=True)
         if value:
             return queryset.filter(id__in=favorite_ids)
@@ -45,8 +55,24 @@ class RecipeFilter(FilterSet):
         if not user.is_authenticated:
             return queryset.none() if value else queryset
         cart_ids = ShoppingCart.objects.filter(
-            user=user
+            user_id=user.id
         ).values_list('recipe_id', flat=True)
         if value:
             return queryset.filter(id__in=cart_ids)
         return queryset.exclude(id__in=cart_ids)
+
+    def filter_have(self, queryset, name, value):
+        """Рецепты из имеющихся ингредиентов, по убыванию покрытия."""
+        missing_max = self.form.cleaned_data.get('missing_max') or 0
+        recipe_ids = pantry.search(value, int(missing_max))
+        return queryset.filter(id__in=recipe_ids).annotate(
+            pantry_rank=Case(
+                *(When(id=pk, then=Value(rank))
+                  for rank, pk in enumerate(recipe_ids)),
+                output_field=IntegerField(),
+            )
+        ).order_by('pantry_rank')
+
+    def filter_missing_max(self, queryset, name, value):
+        """Учитывается в filter_have."""
+        return queryset
@@ -0,0 +1,125 @@
+import json
+import socket
+import subprocess
+import time
+from collections import defaultdict
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def http_request(url, method='GET', data=None, headers=None, timeout=30):
+    """Выполняет HTTP-запрос и возвращает (status, body)."""
+    headers = dict(headers or {})
+    body = None
+    if isinstance(data, bytes):
+        body = data
+    elif data is not None:
+        body = json.dumps(data).encode()
+        headers.setdefault('Content-Type', 'application/json')
+    request = Request(
+        quote(url, safe=':/?&=%#+,'), data=body, method=method, headers=headers
+    )
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except HTTPError as error:
+        return error.code, error.read()
+    except (URLError, OSError) as error:
+        return 0, str(error).encode()
+
+
+class Stats:
+    """Собирает задержки и ошибки по именам запросов."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, name, latency, ok):
+        self.latencies[name].append(latency)
+        if not ok:
+            self.errors[name] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self, name=None):
+        if name is None:
+            latencies = [value for values in self.latencies.values()
+                         for value in values]
+            errors = sum(self.errors.values())
+        else:
+            latencies = self.latencies[name]
+            errors = self.errors[name]
+        total = len(latencies)
+        return {
+            'requests': total,
+            'rps': total / self.elapsed if self.elapsed else 0.0,
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'error_rate': errors / total if total else 0.0,
+        }
+
+    def format_rows(self):
+        rows = [
+            (name, self.summary(name)) for name in sorted(self.latencies)
+        ]
+        rows.append(('TOTAL', self.summary()))
+        lines = [
+            f'{"name":40} {"req":>7} {"rps":>8} {"p50ms":>8} '
+            f'{"p95ms":>8} {"p99ms":>8} {"err%":>6}'
+        ]
+        for name, row in rows:
+            lines.append(
+                f'{name[:40]:40} {row["requests"]:>7} {row["rps"]:>8.1f} '
+                f'{row["p50"]:>8.1f} {row["p95"]:>8.1f} {row["p99"]:>8.1f} '
+                f'{row["error_rate"] * 100:>6.1f}'
+            )
+        return '\n'.join(lines)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(command, env, cwd, url, timeout=30):
+    """Запускает сервер и ждёт, пока он начнёт отвечать."""
+    process = subprocess.Popen(command, env=env, cwd=cwd)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f'Сервер завершился с кодом {process.returncode}'
+            )
+        status, _ = http_request(url, timeout=2)
+        if status:
+            return process
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Сервер не ответил вовремя')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
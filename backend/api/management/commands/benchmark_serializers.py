@@ -0,0 +1,117 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет сериализаторы и фильтр рецептов на сгенерированных '
+        'данных с предзагрузкой и без и сравнивает с сохранённым '
+        'базовым замером'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=200,
+                            help='Число рецептов в фикстуре')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--case', action='append', dest='cases',
+            choices=[case.name for case in benchmarks.CASES],
+        )
+        parser.add_argument(
+            '--baseline', metavar='FILE',
+            help='Сравнить с базовым замером из файла',
+        )
+        parser.add_argument(
+            '--save-baseline', metavar='FILE',
+            help='Сохранить результаты как базовый замер',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10,
+            help='Замедление в процентах, которое считается регрессией',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Завершиться ошибкой, если есть регрессии',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            if baseline['size'] != options['size']:
+                self.stdout.write(self.style.WARNING(
+                    f'Базовый замер снят на {baseline["size"]} рецептах, '
+                    'сравнение неточное'
+                ))
+        cases = [
+            case for case in benchmarks.CASES
+            if not options['cases'] or case.name in options['cases']
+        ]
+        results = {}
+        with transaction.atomic():
+            fixture = benchmarks.build_fixture(options['size'])
+            for case in cases:
+                for prefetch in (True, False):
+                    key = f'{case.name}/{"prefetch" if prefetch else "plain"}'
+                    result = benchmarks.measure(
+                        case(fixture, prefetch), options['repeat']
+                    )
+                    results[key] = {
+                        'objects': result.objects,
+                        'ops': result.objects / result.seconds,
+                        'us_per_object': (
+                            result.seconds / result.objects * 1e6
+                        ),
+                        'queries': result.queries,
+                        'bytes_per_object': result.allocated / result.objects,
+                        'blocks': result.blocks,
+                    }
+            transaction.set_rollback(True)
+        regressions = self.print_results(
+            results, baseline and baseline['results'], options['threshold']
+        )
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'size': options['size'], 'results': results},
+                    file, indent=2, sort_keys=True,
+                )
+            self.stdout.write(
+                f'Базовый замер сохранён в {options["save_baseline"]}'
+            )
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'Регрессий: {regressions}')
+
+    def print_results(self, results, baseline, threshold):
+        self.stdout.write(
+            f'{"case":32} {"objects":>7} {"ops/s":>10} {"us/obj":>9} '
+            f'{"sql":>5} {"B/obj":>9} {"blocks":>7} {"vs base":>8}'
+        )
+        regressions = 0
+        for key, row in results.items():
+            line = (
+                f'{key:32} {row["objects"]:>7} {row["ops"]:>10.0f} '
+                f'{row["us_per_object"]:>9.1f} {row["queries"]:>5} '
+                f'{row["bytes_per_object"]:>9.0f} {row["blocks"]:>7}'
+            )
+            base = (baseline or {}).get(key)
+            if base is None:
+                self.stdout.write(line)
+                continue
+            change = (
+                row['us_per_object'] / base['us_per_object'] - 1
+            ) * 100
+            line += f' {change:>+7.1f}%'
+            if change > threshold or row['queries'] > base['queries']:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(line))
+            elif change < -threshold:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+        return regressions
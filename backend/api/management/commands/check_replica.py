@@ -0,0 +1,127 @@
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIClient
+
+from config import db_router
+from recipes.models import User
+
+CHECK_USERNAME = 'replica-check'
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет роутинг между основной базой и репликой: чтения идут '
+        'в реплику, записи — в основную базу, а после записи чтения '
+        'пользователя закрепляются за основной базой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stand-in', action='store_true',
+            help='Проверить на двух временных базах SQLite вместо '
+                 'настроенных',
+        )
+
+    def handle(self, *args, **options):
+        if options['stand_in']:
+            self.run_stand_in()
+            return
+        if db_router.REPLICA not in settings.DATABASES:
+            raise CommandError(
+                'Реплика не настроена: задайте DB_REPLICA_HOST или '
+                'DB_REPLICA_NAME'
+            )
+        user = User.objects.create_user(
+            username=CHECK_USERNAME,
+            email=f'{CHECK_USERNAME}@localhost',
+            password=secrets.token_urlsafe(),
+            first_name=CHECK_USERNAME,
+            last_name=CHECK_USERNAME,
+        )
+        try:
+            self.check_routing(user)
+        finally:
+            cache.delete(db_router.pin_key(user.pk))
+            user.delete()
+        self.stdout.write(self.style.SUCCESS('Роутинг работает'))
+
+    def check_routing(self, user):
+        host = next(
+            (name.lstrip('.') for name in settings.ALLOWED_HOSTS
+             if '*' not in name),
+            'localhost'
+        )
+        anonymous = APIClient(HTTP_HOST=host)
+        self.expect(
+            'Чтение', db_router.REPLICA,
+            lambda: anonymous.get('/api/tags/'),
+        )
+        client = APIClient(HTTP_HOST=host)
+        client.force_authenticate(user)
+        password = secrets.token_urlsafe()
+        user.set_password(password)
+        user.save(update_fields=['password'])
+        self.expect('Запись', 'default', lambda: client.post(
+            '/api/users/set_password/',
+            {'current_password': password,
+             'new_password': secrets.token_urlsafe()},
+            format='json',
+        ))
+        self.expect(
+            'Чтение после записи', 'default',
+            lambda: client.get('/api/tags/'),
+        )
+
+    def expect(self, title, alias, request):
+        queries = Counter()
+
+        def record(execute, sql, params, many, context):
+            queries[context['connection'].alias] += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for name in connections:
+                stack.enter_context(
+                    connections[name].execute_wrapper(record)
+                )
+            response = request()
+        if response.status_code >= 400:
+            raise CommandError(f'{title}: ответ {response.status_code}')
+        used = ', '.join(
+            f'{name} — {count}' for name, count in sorted(queries.items())
+        )
+        self.stdout.write(f'{title}: {used or "нет запросов"}')
+        if not queries[alias] or set(queries) != {alias}:
+            raise CommandError(f'{title}: запросы должны идти в {alias}')
+
+    def run_stand_in(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                'DB_ENGINE': 'django.db.backends.sqlite3',
+                'POSTGRES_DB': os.path.join(directory, 'primary.sqlite3'),
+                'DB_REPLICA_NAME': os.path.join(directory, 'replica.sqlite3'),
+                'ALLOWED_HOSTS': 'localhost',
+            }
+            manage = [sys.executable, 'manage.py']
+            for alias in ('default', db_router.REPLICA):
+                subprocess.run(
+                    [*manage, 'migrate', '--database', alias, '-v', '0'],
+                    env=env, cwd=settings.BASE_DIR, check=True,
+                )
+            self.stdout.write('Базы: две временные SQLite')
+            result = subprocess.run(
+                [*manage, 'check_replica'], env=env, cwd=settings.BASE_DIR,
+            )
+        if result.returncode:
+            raise CommandError('Проверка на временных базах не прошла')
@@ -0,0 +1,77 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import loadgen
+
+DEFAULT_PATHS = [
+    '/api/recipes/',
+    '/api/tags/',
+    '/api/ingredients/?name=м',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность read-only эндпоинтов '
+        'под WSGI (sync-воркеры) и ASGI (uvicorn-воркеры)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--modes', nargs='+', default=['wsgi', 'asgi'],
+            choices=['wsgi', 'asgi'],
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        for mode in options['modes']:
+            port = loadgen.free_port()
+            base_url = f'http://localhost:{port}'
+            env = {
+                **os.environ,
+                'SERVER_MODE': mode,
+                'GUNICORN_BIND': f'127.0.0.1:{port}',
+                'GUNICORN_WORKERS': str(options['workers']),
+                'ALLOWED_HOSTS': os.getenv('ALLOWED_HOSTS', '') + ',localhost',
+            }
+            process = loadgen.start_server(
+                ['gunicorn', '--config', 'gunicorn.conf.py'],
+                env=env,
+                cwd=settings.BASE_DIR,
+                url=base_url + paths[0],
+            )
+            try:
+                self.run_load(base_url, paths, options['concurrency'], 20)
+                stats = self.run_load(
+                    base_url, paths, options['concurrency'],
+                    options['requests'],
+                )
+            finally:
+                loadgen.stop_server(process)
+            self.stdout.write(self.style.SUCCESS(
+                f'\n{mode.upper()}: воркеров {options["workers"]}, '
+                f'одновременных запросов {options["concurrency"]}'
+            ))
+            self.stdout.write(stats.format_rows())
+
+    def run_load(self, base_url, paths, concurrency, total):
+        stats = loadgen.Stats()
+
+        def fetch(path):
+            started = time.perf_counter()
+            status, _ = loadgen.http_request(base_url + path)
+            stats.record(path, time.perf_counter() - started, status == 200)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(fetch, islice(cycle(paths), total)))
+        stats.stop()
+        return stats
@@ -0,0 +1,132 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?!subquery)(\w+)\b(?! USING)'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет SQL, который генерируют эндпоинты API, через EXPLAIN '
+        'и отмечает последовательные сканирования таблиц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого выполнять запросы',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            default=[],
+            help='Дополнительный путь (можно указать несколько раз)',
+        )
+        parser.add_argument(
+            '--ignore',
+            action='append',
+            default=[],
+            help='Таблица, сканирование которой не считать проблемой',
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f'EXPLAIN не поддерживается для {connection.vendor}'
+            )
+        user = self.get_user(options['user'])
+        ignored = set(options['ignore'])
+        flagged = 0
+        for path in self.get_paths(user) + options['path']:
+            queries = self.capture_queries(path, user)
+            self.stdout.write(f'\n{path}: запросов {len(queries)}')
+            for sql in queries:
+                plan = self.explain(sql)
+                tables = [
+                    table for table in pattern.findall(plan)
+                    if table not in ignored
+                ]
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  {sql}\n{plan}')
+                if tables:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'  Seq scan ({", ".join(tables)}): {sql[:200]}'
+                    ))
+        if flagged:
+            self.stdout.write(self.style.WARNING(
+                f'\nЗапросов с последовательным сканированием: {flagged}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                '\nПоследовательных сканирований не найдено.'
+            ))
+
+    def get_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь не найден: {email}')
+        return User.objects.order_by('id').first()
+
+    def get_paths(self, user):
+        paths = [
+            '/api/tags/',
+            '/api/ingredients/?name=а',
+            '/api/recipes/',
+            '/api/users/',
+        ]
+        recipe = Recipe.objects.order_by('-created').first()
+        if recipe:
+            paths += [
+                f'/api/recipes/{recipe.id}/',
+                f'/api/recipes/?author={recipe.author_id}',
+            ]
+        tag = Tag.objects.first()
+        if tag:
+            paths.append(f'/api/recipes/?tags={tag.slug}')
+        if user:
+            paths += [
+                '/api/recipes/?is_favorited=1',
+                '/api/recipes/?is_in_shopping_cart=1',
+                '/api/users/subscriptions/',
+                '/api/recipes/download_shopping_cart/',
+            ]
+        return paths
+
+    def capture_queries(self, path, user):
+        """Выполняет GET-запрос к эндпоинту и возвращает его SELECT-ы."""
+        url = path.partition('?')[0]
+        request = APIRequestFactory().get(path)
+        if user:
+            force_authenticate(request, user=user)
+        match = resolve(url)
+        with CaptureQueriesContext(connection) as context:
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+
+    def explain(self, sql):
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            rows = cursor.fetchall()
+        return '\n'.join('    ' + str(row[-1]) for row in rows)
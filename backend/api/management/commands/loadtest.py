@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import loadgen, postman
+from recipes.models import Ingredient, Tag, User
+
+DEFAULT_COLLECTION = os.path.join(
+    settings.BASE_DIR.parent,
+    'postman_collection',
+    'foodgram.postman_collection.json',
+)
+# Бюджеты CostThrottle для локального сервера: нагрузку дают все
+# виртуальные пользователи с одного IP.
+UNLIMITED_BUDGET = str(10 ** 9)
+
+
+def parse_weight(value):
+    pattern, _, weight = value.rpartition('=')
+    if not pattern or not weight.isdigit():
+        raise ValueError(value)
+    return pattern, int(weight)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: виртуальные пользователи параллельно проходят '
+        'Postman-коллекцию; отчёт по пропускной способности, задержкам и '
+        'ошибкам для каждого запроса'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', default=DEFAULT_COLLECTION)
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера; без него сервер запускается '
+                 'локально на текущей базе',
+        )
+        parser.add_argument('--users', type=int, default=10,
+                            help='Число виртуальных пользователей')
+        parser.add_argument('--duration', type=float, default=60,
+                            help='Длительность теста, с')
+        parser.add_argument(
+            '--iterations', type=int,
+            help='Проходов коллекции на пользователя вместо --duration',
+        )
+        parser.add_argument('--ramp-up', type=float, default=0,
+                            help='За сколько секунд запустить всех')
+        parser.add_argument(
+            '--weight', action='append', default=[], type=parse_weight,
+            metavar='PATTERN=N',
+            help='Повторить GET-запросы, путь которых в коллекции совпадает '
+                 'с шаблоном, N раз (0 — пропустить запросы), например '
+                 '"recipes/get_recipes/*=5"',
+        )
+        parser.add_argument(
+            '--skip-bad-requests', action='store_true',
+            help='Не отправлять запросы из папок *bad_requests',
+        )
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--mode', choices=['wsgi', 'asgi'], default='wsgi'
+        )
+        parser.add_argument('--max-p95', type=float, metavar='MS')
+        parser.add_argument('--max-error-rate', type=float, metavar='PCT')
+        parser.add_argument('--min-rps', type=float)
+
+    def handle(self, *args, **options):
+        weights = list(options['weight'])
+        if options['skip_bad_requests']:
+            weights.insert(0, ('*bad_requests*', 0))
+        variables, steps = postman.load_collection(
+            options['collection'], weights
+        )
+        run_id = postman.make_run_id()
+        if options['url']:
+            stats, users = self.run_load(
+                options['url'].rstrip('/'), variables, steps, run_id,
+                options,
+            )
+        else:
+            self.check_data()
+            process, base_url = self.start_server(options)
+            try:
+                stats, users = self.run_load(
+                    base_url, variables, steps, run_id, options
+                )
+            finally:
+                loadgen.stop_server(process)
+                deleted, _ = User.objects.filter(
+                    username__startswith=run_id
+                ).delete()
+                self.stdout.write(f'Удалено объектов теста: {deleted}')
+        self.report(stats, users, options)
+
+    def check_data(self):
+        # Коллекции нужны хотя бы 3 тега и 2 ингредиента.
+        if Tag.objects.count() < 3 or Ingredient.objects.count() < 2:
+            raise CommandError(
+                'В базе должно быть не меньше 3 тегов и 2 ингредиентов'
+            )
+
+    def start_server(self, options):
+        port = loadgen.free_port()
+        base_url = f'http://localhost:{port}'
+        env = {
+            **os.environ,
+            'SERVER_MODE': options['mode'],
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'GUNICORN_WORKERS': str(options['workers']),
+            'ALLOWED_HOSTS': os.getenv('ALLOWED_HOSTS', '') + ',localhost',
+            # Все виртуальные пользователи приходят с одного адреса.
+            'THROTTLE_USER_BUDGET': UNLIMITED_BUDGET,
+            'THROTTLE_ANON_BUDGET': UNLIMITED_BUDGET,
+            'THROTTLE_IP_BUDGET': UNLIMITED_BUDGET,
+            'THROTTLE_MAX_CONCURRENT': UNLIMITED_BUDGET,
+        }
+        process = loadgen.start_server(
+            ['gunicorn', '--config', 'gunicorn.conf.py'],
+            env=env,
+            cwd=settings.BASE_DIR,
+            url=base_url + '/api/tags/',
+        )
+        return process, base_url
+
+    def run_load(self, base_url, variables, steps, run_id, options):
+        stats = loadgen.Stats()
+        deadline = None
+        if options['iterations'] is None:
+            deadline = time.monotonic() + options['duration']
+        users = [
+            postman.VirtualUser(
+                number, base_url, variables, steps, stats, run_id
+            )
+            for number in range(options['users'])
+        ]
+        threads = []
+        delay = options['ramp_up'] / max(len(users), 1)
+        for user in users:
+            thread = threading.Thread(
+                target=user.run,
+                kwargs={
+                    'deadline': deadline,
+                    'iterations': options['iterations'],
+                },
+            )
+            thread.start()
+            threads.append(thread)
+            time.sleep(delay)
+        for thread in threads:
+            thread.join()
+        stats.stop()
+        return stats, users
+
+    def report(self, stats, users, options):
+        iterations = sum(user.iterations for user in users)
+        skipped = sum(user.skipped for user in users)
+        self.stdout.write(stats.format_rows())
+        self.stdout.write(
+            f'\nПользователей: {len(users)}, проходов коллекции: '
+            f'{iterations}, пропущено запросов без переменных: {skipped}, '
+            f'время: {stats.elapsed:.1f} с'
+        )
+        total = stats.summary()
+        failures = []
+        if options['max_p95'] is not None and total['p95'] > options[
+            'max_p95'
+        ]:
+            failures.append(f'p95 {total["p95"]:.1f} мс')
+        if options['max_error_rate'] is not None and (
+            total['error_rate'] * 100 > options['max_error_rate']
+        ):
+            failures.append(f'ошибок {total["error_rate"] * 100:.1f}%')
+        if options['min_rps'] is not None and total['rps'] < options[
+            'min_rps'
+        ]:
+            failures.append(f'{total["rps"]:.1f} запросов/с')
+        if failures:
+            raise CommandError(
+                'Порог не пройден: ' + ', '.join(failures)
+            )
+        if any(options[key] is not None for key in (
+            'max_p95', 'max_error_rate', 'min_rps'
+        )):
+            self.stdout.write(self.style.SUCCESS('Пороги пройдены'))
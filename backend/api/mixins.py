@@ -0,0 +1,82 @@
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+from config import db_router
+from profiling import profiler
+
+
+class ReplicaReadMixin:
+    """Читает данные для безопасных запросов из реплики БД.
+
+    Пользователь, который только что что-то записал, читает из основной
+    базы, пока не истечёт REPLICA_PIN_SECONDS.
+    """
+
+    replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            and not db_router.is_pinned(request.user)
+        ):
+            self.replica_token = db_router.use_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.replica_token is not None:
+            db_router.release(self.replica_token)
+            self.replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ProfilingMixin:
+    """Снимает профиль обработки запроса по заголовку X-Profile от
+    сотрудника или по случайной выборке PROFILING_SAMPLE_RATE, а профиль
+    памяти — для эндпоинтов из MEMORY_PROFILING_ENDPOINTS или по
+    заголовку X-Profile-Memory.
+
+    Номер сохранённого профиля возвращается в заголовке X-Profile-Id
+    или X-Allocation-Profile-Id.
+    """
+
+    profiling_request = None
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Запрос DRF, на котором dispatch уже аутентифицировал сотрудника.
+        if self.profiling_request is not None:
+            return self.profiling_request
+        return super().initialize_request(request, *args, **kwargs)
+
+    def is_staff(self, request, *args, **kwargs):
+        if self.profiling_request is None:
+            drf_request = self.initialize_request(request, *args, **kwargs)
+            try:
+                drf_request.user
+            except APIException:
+                # Ошибку аутентификации вернёт обычная обработка запроса.
+                return False
+            self.profiling_request = drf_request
+        return self.profiling_request.user.is_staff
+
+    def dispatch(self, request, *args, **kwargs):
+        # self.action появится только в initialize_request.
+        method = request.method.lower()
+        action = self.action_map.get(method) or method
+        endpoint = f'{type(self).__name__}.{action}'
+
+        def call():
+            return super(ProfilingMixin, self).dispatch(
+                request, *args, **kwargs
+            )
+
+        def is_staff():
+            return self.is_staff(request, *args, **kwargs)
+
+        def get_user():
+            return self.request.user
+
+        if profiler.memory_requested(request, endpoint, is_staff):
+            return profiler.profile_memory(request, endpoint, get_user, call)
+        if profiler.requested(request, is_staff):
+            return profiler.profile(request, endpoint, get_user, call)
+        return call()
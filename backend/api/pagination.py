@@ -0,0 +1,44 @@
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+
+from recipes import counts
+
+
+class CachedCountPaginator(Paginator):
+    """Берёт число строк из кеша или оценки вместо COUNT(*)."""
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        count, self.estimated = counts.cached_count(self.object_list)
+        return count
+
+
+class CachedCountPagination(PageNumberPagination):
+    """PageNumberPagination с кешированным или оценочным count.
+
+    Если оценка разошлась с данными, по неполной странице число строк
+    уточняется, так что на последней странице count точный.
+    """
+
+    django_paginator_class = CachedCountPaginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = super().paginate_queryset(queryset, request, view)
+        if page is None:
+            return page
+        paginator = self.page.paginator
+        if not paginator.estimated or len(page) >= paginator.per_page:
+            return page
+        if not page and self.page.number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=self.page.number, message='That page is empty'
+            ))
+        paginator.count = (
+            (self.page.number - 1) * paginator.per_page + len(page)
+        )
+        paginator.__dict__.pop('num_pages', None)
+        return page
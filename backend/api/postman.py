@@ -0,0 +1,235 @@
+"""Сценарии нагрузочного теста из Postman-коллекции.
+
+Коллекция описывает полный путь пользователя по API: регистрация,
+токены, рецепты, избранное, корзина, подписки и удаление. Из тестовых
+скриптов берутся только ожидаемый статус-код и переменные, которые
+запрос сохраняет (id, токены, слаги); JavaScript не выполняется.
+
+Каждая итерация виртуального пользователя проходит коллекцию целиком
+со своими email и username, поэтому итерации не мешают друг другу.
+"""
+import json
+import random
+import re
+import time
+from collections import namedtuple
+from fnmatch import fnmatch
+
+from api import loadgen
+
+VARIABLE = re.compile(r'{{(\w+)}}')
+EXPECTED_STATUS = re.compile(r'Статус-код ответа должен быть (\d{3})')
+LOCAL = re.compile(r'const (\w+) = _\.get\(responseData, "([\w.]+)"\)')
+SET = re.compile(
+    r'''collectionVariables\.set\(["'](\w+)["'],\s*(.+?)\);?\s*$'''
+)
+ITEM = re.compile(r'^responseData\[(\d+)\]\.(\w+)(\.slice\(0,\s*1\))?$')
+# Переменные с email и username, которые уникализируются в каждой итерации.
+IDENTITY = re.compile(r'(email|username)$', re.IGNORECASE)
+
+Capture = namedtuple('Capture', 'variable path first_char')
+Step = namedtuple(
+    'Step', 'name path method url headers body expected captures weight'
+)
+
+
+def parse_captures(lines):
+    """Переменные, которые тестовый скрипт сохраняет из ответа."""
+    local = {}
+    captures = []
+    for line in lines:
+        match = LOCAL.search(line)
+        if match:
+            local[match[1]] = tuple(match[2].split('.'))
+            continue
+        match = SET.search(line)
+        if not match:
+            continue
+        variable, expression = match[1], match[2].strip()
+        if expression in local:
+            captures.append(Capture(variable, local[expression], False))
+            continue
+        item = ITEM.match(expression)
+        if item:
+            captures.append(Capture(
+                variable, (int(item[1]), item[2]), bool(item[3])
+            ))
+    return captures
+
+
+def parse_auth(auth):
+    if not auth or auth.get('type') != 'apikey':
+        return {}
+    options = {option['key']: option['value'] for option in auth['apikey']}
+    return {options.get('key', 'Authorization'): options['value']}
+
+
+def load_collection(path, weights=()):
+    """Читает коллекцию и возвращает переменные и список шагов.
+
+    weights — пары (шаблон пути, вес): GET-запросы, путь которых
+    совпадает с шаблоном, повторяются вес раз, а запросы с весом 0
+    пропускаются.
+    """
+    with open(path, encoding='utf-8') as file:
+        collection = json.load(file)
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', [])
+    }
+    steps = []
+
+    def walk(items, folder, auth):
+        for item in items:
+            path = f'{folder}/{item["name"]}' if folder else item['name']
+            if 'item' in item:
+                walk(item['item'], path, item.get('auth') or auth)
+                continue
+            script = [
+                line for event in item.get('event', [])
+                if event['listen'] == 'test'
+                for line in event['script']['exec']
+            ]
+            expected = EXPECTED_STATUS.search('\n'.join(script))
+            request = item['request']
+            url = request['url']
+            weight = 1
+            for pattern, value in weights:
+                if fnmatch(path, pattern):
+                    weight = value
+            if request['method'] != 'GET':
+                weight = min(weight, 1)
+            headers = {
+                header['key']: header['value']
+                for header in request.get('header', [])
+                if not header.get('disabled')
+            }
+            # Без своей авторизации запрос наследует её от папки.
+            headers.update(parse_auth(request.get('auth') or auth))
+            body = request.get('body') or {}
+            if body.get('raw'):
+                headers.setdefault('Content-Type', 'application/json')
+            steps.append(Step(
+                name=item['name'].strip(),
+                path=path,
+                method=request['method'],
+                url=url['raw'] if isinstance(url, dict) else url,
+                headers=headers,
+                body=body.get('raw') or None,
+                expected=int(expected[1]) if expected else None,
+                captures=parse_captures(script),
+                weight=weight,
+            ))
+
+    walk(collection['item'], '', collection.get('auth'))
+    return variables, steps
+
+
+def render(template, variables):
+    """Подставляет переменные; None, если какой-то переменной нет."""
+    missing = False
+
+    def replace(match):
+        nonlocal missing
+        if match[1] not in variables:
+            missing = True
+            return ''
+        return str(variables[match[1]])
+
+    rendered = VARIABLE.sub(replace, template)
+    return None if missing else rendered
+
+
+def extract(data, capture):
+    try:
+        for key in capture.path:
+            data = data[key]
+    except (KeyError, IndexError, TypeError):
+        return None
+    if capture.first_char:
+        return str(data)[:1]
+    return data
+
+
+def identities(variables, prefix):
+    """Копия переменных с уникальными email и username."""
+    unique = dict(variables)
+    for key, value in variables.items():
+        if IDENTITY.search(key) and not key.startswith('tooLong'):
+            quoted = value.startswith('"')
+            value = value.strip('"')
+            value = f'{prefix}-{value}'
+            unique[key] = f'"{value}"' if quoted else value
+    return unique
+
+
+class VirtualUser:
+    """Проходит коллекцию по кругу и записывает результаты в Stats."""
+
+    def __init__(self, number, base_url, variables, steps, stats, run_id):
+        self.number = number
+        self.base_url = base_url
+        self.variables = variables
+        self.steps = steps
+        self.stats = stats
+        self.run_id = run_id
+        self.iterations = 0
+        self.skipped = 0
+
+    def run(self, deadline=None, iterations=None):
+        while True:
+            if iterations is not None and self.iterations >= iterations:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            self.iterate()
+
+    def iterate(self):
+        self.iterations += 1
+        variables = identities(
+            self.variables,
+            f'{self.run_id}u{self.number}i{self.iterations}',
+        )
+        variables['baseUrl'] = self.base_url
+        for step in self.steps:
+            for _ in range(step.weight):
+                self.send(step, variables)
+
+    def send(self, step, variables):
+        url = render(step.url, variables)
+        headers = {
+            key: render(value, variables)
+            for key, value in step.headers.items()
+        }
+        body = render(step.body, variables) if step.body else None
+        if url is None or None in headers.values() or (
+            step.body and body is None
+        ):
+            # Не хватает переменной из пропущенного шага.
+            self.skipped += 1
+            return
+        started = time.perf_counter()
+        status, content = loadgen.http_request(
+            url,
+            method=step.method,
+            data=body.encode() if body else None,
+            headers=headers,
+        )
+        self.stats.record(
+            step.name,
+            time.perf_counter() - started,
+            status == step.expected if step.expected else 0 < status < 400,
+        )
+        if step.captures and status == step.expected:
+            try:
+                data = json.loads(content)
+            except ValueError:
+                return
+            for capture in step.captures:
+                value = extract(data, capture)
+                if value is not None:
+                    variables[capture.variable] = value
+
+
+def make_run_id():
+    return f'lt{random.getrandbits(24):06x}'
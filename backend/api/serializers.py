@@ -3,16 +3,56 @@ import re
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from api.authentication import USER_CLAIMS
 from api.fields import Base64ImageField
-from recipes.models import (Favorite, Follow, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart, Tag)
+from recipes import pantry, tasks
+from recipes.models import Follow, Ingredient, Recipe, RecipeIngredient, Tag
 
 User = get_user_model()
 
 
-class UserSerializer(DjoserUserSerializer):
+def split_param(params, name):
+    return {field.strip() for field in params.get(name, '').split(',')
+            if field.strip()}
+
+
+def sparse_fields(request, serializer_class):
+    """Поля сериализатора, запрошенные через ?fields= без ?omit=.
+
+    None, если параметров нет или запрос изменяет данные.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = split_param(request.GET, 'fields')
+    omit = split_param(request.GET, 'omit')
+    if not fields and not omit:
+        return None
+    selected = set(serializer_class.Meta.fields)
+    if fields:
+        selected &= fields
+    return selected - omit
+
+
+class SparseFieldsMixin:
+    """Отдаёт только поля из ?fields= и не отдаёт поля из ?omit=.
+
+    Параметры относятся к сериализатору верхнего уровня: вложенные
+    сериализаторы создаются без контекста и отдаются целиком.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = sparse_fields(self.context.get('request'), type(self))
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+
+class UserSerializer(SparseFieldsMixin, DjoserUserSerializer):
     """Сериализатор пользователя."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -27,10 +67,15 @@ class UserSerializer(DjoserUserSerializer):
 
     def get_is_subscribed(self, obj):
         """Подписан ли пользователь на автора."""
+        subscribed_ids = self.context.get('subscribed_ids')
+        if subscribed_ids is not None:
+            return obj.id in subscribed_ids
         user = self.context.get('request').user
         return (
             user.is_authenticated
-            and user.following.filter(following=obj).exists()
+            and Follow.objects.filter(
+                user_id=user.id, following=obj
+            ).exists()
         )
 
     def get_avatar(self, obj):
@@ -83,6 +128,15 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug')
 
 
+class TagFacetSerializer(TagSerializer):
+    """Тег с числом рецептов, подходящих под фильтр."""
+
+    count = serializers.IntegerField()
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('count',)
+
+
 class FollowSerializer(serializers.ModelSerializer):
     """Сериализатор подписок."""
 
@@ -104,38 +158,15 @@ class FollowSerializer(serializers.ModelSerializer):
             'recipes_count', 'avatar',
         )
 
-    def validate(self, data):
-        """Валидация подписки (на себя, повторной)."""
-        user = self.context['request'].user
-        following = self.context.get('following_user')
-        if not following:
-            raise serializers.ValidationError(
-                'Нет целевого пользователя для подписки.'
-            )
-
-        if user == following:
-            raise serializers.ValidationError(
-                'Нельзя подписаться на самого себя.'
-            )
-
-        if Follow.objects.filter(user=user, following=following).exists():
-            raise serializers.ValidationError(
-                'Вы уже подписаны на этого пользователя.'
-            )
-
-        return data
-
-    def create(self, validated_data):
-        user = self.context['request'].user
-        following = self.context['following_user']
-        return Follow.objects.create(user=user, following=following)
-
     def get_is_subscribed(self, obj):
+        subscribed_ids = self.context.get('subscribed_ids')
+        if subscribed_ids is not None:
+            return obj.following_id in subscribed_ids
         user = self.context.get('request').user
         if not user or not user.is_authenticated:
             return False
         return Follow.objects.filter(
-            user=user, following=obj.following
+            user_id=user.id, following_id=obj.following_id
         ).exists()
 
     def get_avatar(self, obj):
@@ -206,7 +237,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор рецептов."""
 
     author = UserSerializer(read_only=True)
@@ -243,19 +274,21 @@ class RecipeSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Добавление тегов и картинки к рецепту."""
         data = super().to_representation(instance)
-        data['tags'] = TagSerializer(instance.tags.all(), many=True).data
-        request = self.context.get('request')
-        data['image'] = (
-            request.build_absolute_uri(instance.image.url)
-            if instance.image
-            else None
-        )
+        if 'tags' in self.fields:
+            data['tags'] = TagSerializer(instance.tags.all(), many=True).data
+        if 'image' in self.fields:
+            request = self.context.get('request')
+            data['image'] = (
+                request.build_absolute_uri(instance.image.url)
+                if instance.image
+                else None
+            )
         return data
 
     def validate(self, attrs):
         """Валидация данных рецепта."""
         request = self.context.get('request')
-        if self.instance and self.instance.author != request.user:
+        if self.instance and self.instance.author_id != request.user.id:
             raise PermissionDenied(
                 'Вы не можете редактировать чужой рецепт.'
             )
@@ -329,7 +362,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredient_amounts', [])
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags_data)
-        self.add_ingredients(recipe, ingredients_data)
+        with pantry.batch(recipe.id):
+            self.add_ingredients(recipe, ingredients_data)
+        tasks.refresh_similar.delay(
+            recipe_id=recipe.id, dedup_key=f'similar:{recipe.id}'
+        )
         return recipe
 
     def update(self, instance, validated_data):
@@ -337,34 +374,34 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredient_amounts', [])
         instance = super().update(instance, validated_data)
         instance.tags.set(tags_data)
-        instance.ingredient_amounts.all().delete()
-        self.add_ingredients(instance, ingredients_data)
+        with pantry.batch(instance.id):
+            instance.ingredient_amounts.all().delete()
+            self.add_ingredients(instance, ingredients_data)
+        tasks.refresh_similar.delay(
+            recipe_id=instance.id, dedup_key=f'similar:{instance.id}'
+        )
         return instance
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
-    """Сериализатор для добавления рецепта в избранное."""
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выдаёт пару токенов с данными пользователя внутри."""
 
-    class Meta:
-        model = Favorite
-        fields = ('recipe',)
-
-    def create(self, validated_data):
-        return Favorite.objects.create(
-            user=self.context['request'].user,
-            **validated_data
-        )
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    """Сериализатор для добавления рецепта в список покупок."""
+class TokenLoginSerializer(ClaimsTokenObtainPairSerializer):
+    """Вход по email и паролю с ответом в прежнем формате."""
 
-    class Meta:
-        model = ShoppingCart
-        fields = ('recipe',)
-
-    def create(self, validated_data):
-        return ShoppingCart.objects.create(
-            user=self.context['request'].user,
-            **validated_data
-        )
+    def validate(self, attrs):
+        try:
+            data = super().validate(attrs)
+        except AuthenticationFailed:
+            raise serializers.ValidationError(
+                'Невозможно войти с предоставленными учетными данными.'
+            )
+        return {'auth_token': data['access']}
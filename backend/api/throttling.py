@@ -0,0 +1,190 @@
+"""Ограничение частоты запросов с учётом их стоимости.
+
+Каждый запрос списывает из бюджета клиента столько единиц, сколько в
+среднем стоит его эндпоинт: время в базе, процессорное время и объём
+переданных данных. Стоимость измеряет RequestCostMiddleware.
+
+Счётчики скользящих окон хранятся в кэше Django. Бюджет общий для всех
+воркеров только при общем кэше (Redis из docker-compose); с LocMemCache
+у каждого процесса он свой, о чём предупреждает проверка api.W001.
+Проверка запроса читает все нужные ключи одним get_many.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+DB_MS_PER_UNIT = 5
+CPU_MS_PER_UNIT = 10
+KB_PER_UNIT = 64
+COST_SMOOTHING = 0.2
+# Эндпоинты, где почти всё процессорное время уходит на хеширование
+# пароля (PBKDF2): с ним вход стоил бы около 20 единиц.
+PASSWORD_HASHING_ENDPOINTS = {
+    'POST:login',
+    'POST:jwt-create',
+    'POST:user-list',
+    'POST:user-set-password',
+    'POST:user-set-username',
+    'POST:user-reset-password-confirm',
+}
+
+
+def endpoint_key(request):
+    match = request.resolver_match
+    return f'{request.method}:{match.view_name if match else request.path}'
+
+
+def cost_key(endpoint):
+    return f'throttle-cost:{endpoint}'
+
+
+def measure(request, db_seconds, cpu_seconds, payload_bytes):
+    """Переводит измерения запроса в единицы бюджета.
+
+    Процессорное время эндпоинтов с паролем не учитывается.
+    """
+    if endpoint_key(request) in PASSWORD_HASHING_ENDPOINTS:
+        cpu_seconds = 0
+    return (
+        1
+        + db_seconds * 1000 / DB_MS_PER_UNIT
+        + cpu_seconds * 1000 / CPU_MS_PER_UNIT
+        + payload_bytes / 1024 / KB_PER_UNIT
+    )
+
+
+def units(cost):
+    return max(round(cost), 1)
+
+
+def window_keys(scope, ident, now):
+    """Ключи текущего и предыдущего окна и доля прошедшего окна."""
+    window = settings.THROTTLE_WINDOW
+    index = int(now // window)
+    prefix = f'throttle:{scope}:{ident}'
+    return (
+        f'{prefix}:{index}', f'{prefix}:{index - 1}', now % window / window
+    )
+
+
+def charge(key, amount, exists=True):
+    """Прибавляет amount к счётчику окна.
+
+    Отсутствующий ключ создаётся через add, чтобы не затереть значение,
+    которое одновременно создал другой запрос.
+    """
+    timeout = settings.THROTTLE_WINDOW * 2
+    if not exists and cache.add(key, max(amount, 0), timeout):
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # Ключ успел истечь.
+        cache.set(key, max(amount, 0), timeout)
+
+
+def inflight_key(ident):
+    return f'throttle-inflight:{ident}'
+
+
+def acquire_slot(ident):
+    """Занимает одно из мест для одновременных тяжёлых запросов клиента."""
+    key = inflight_key(ident)
+    cache.add(key, 0, settings.THROTTLE_WINDOW)
+    if cache.incr(key) > settings.THROTTLE_MAX_CONCURRENT:
+        cache.decr(key)
+        return False
+    return True
+
+
+def release_slot(ident):
+    try:
+        cache.decr(inflight_key(ident))
+    except ValueError:
+        pass
+
+
+def record(request, cost):
+    """Обновляет среднюю стоимость эндпоинта по измерениям запроса.
+
+    Если запрос прошёл через CostThrottle, в окна клиента доплачивается
+    разница между оценкой, списанной заранее, и измеренной стоимостью.
+    """
+    key = cost_key(endpoint_key(request))
+    if hasattr(request, 'throttle_average'):
+        average = request.throttle_average
+    else:
+        average = cache.get(key)
+    if average is not None:
+        cost = average + (cost - average) * COST_SMOOTHING
+    cache.set(key, cost, None)
+    charged = getattr(request, 'throttle_charged', None)
+    if charged is None:
+        return
+    charged_units, keys = charged
+    delta = units(cost) - charged_units
+    if delta:
+        for window_key in keys:
+            charge(window_key, delta)
+    slot = getattr(request, 'throttle_slot', None)
+    if slot is not None:
+        release_slot(slot)
+
+
+class CostThrottle(BaseThrottle):
+    """Скользящие окна по пользователю и по IP с бюджетом в единицах
+    стоимости.
+
+    Эндпоинты дороже THROTTLE_HEAVY_COST единиц клиент может выполнять
+    не более THROTTLE_MAX_CONCURRENT одновременно, чтобы несколько
+    тяжёлых клиентов не заняли все воркеры.
+    """
+
+    wait_seconds = None
+
+    def get_windows(self, request):
+        ip = self.get_ident(request)
+        if request.user.is_authenticated:
+            return [('user', request.user.id), ('ip', ip)]
+        return [('anon', ip)]
+
+    def allow_request(self, request, view):
+        django_request = request._request
+        now = time.time()
+        idents = self.get_windows(request)
+        windows = [
+            (scope, window_keys(scope, ident, now)) for scope, ident in idents
+        ]
+        average_key = cost_key(endpoint_key(django_request))
+        values = cache.get_many([average_key] + [
+            key for _, (current, previous, _) in windows
+            for key in (current, previous)
+        ])
+        average = values.get(average_key)
+        django_request.throttle_average = average
+        cost = units(1 if average is None else average)
+        for scope, (current, previous, elapsed) in windows:
+            usage = (
+                values.get(previous, 0) * (1 - elapsed)
+                + values.get(current, 0)
+            )
+            if usage + cost > settings.THROTTLE_BUDGETS[scope]:
+                window = settings.THROTTLE_WINDOW
+                self.wait_seconds = window - now % window
+                return False
+        if cost >= settings.THROTTLE_HEAVY_COST:
+            slot = idents[0][1]
+            if not acquire_slot(slot):
+                self.wait_seconds = 1
+                return False
+            django_request.throttle_slot = slot
+        keys = [current for _, (current, _, _) in windows]
+        for key in keys:
+            charge(key, cost, exists=key in values)
+        django_request.throttle_charged = (cost, keys)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from api import async_views
+from api.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
+                       TokenLoginView, TokenLogoutView, UserViewSet)
 
 router = DefaultRouter()
 router.register('users', UserViewSet)
@@ -9,9 +12,44 @@ router.register('recipes', RecipeViewSet)
 router.register('tags', TagViewSet)
 router.register('ingredients', IngredientViewSet)
 
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+async_urlpatterns = [
+    path('api/tags/', async_views.async_read_view(
+        async_views.tag_list, TagViewSet.as_view({'get': 'list'})
+    )),
+    path('api/tags/<int:pk>/', async_views.async_read_view(
+        async_views.tag_detail, TagViewSet.as_view({'get': 'retrieve'})
+    )),
+    path('api/ingredients/', async_views.async_read_view(
+        async_views.ingredient_list,
+        IngredientViewSet.as_view({'get': 'list'})
+    )),
+    path('api/ingredients/<int:pk>/', async_views.async_read_view(
+        async_views.ingredient_detail,
+        IngredientViewSet.as_view({'get': 'retrieve'})
+    )),
+    path('api/recipes/', async_views.async_read_view(
+        async_views.recipe_list, RecipeViewSet.as_view(LIST_ACTIONS)
+    )),
+    path('api/recipes/<int:pk>/', async_views.async_read_view(
+        async_views.recipe_detail, RecipeViewSet.as_view(DETAIL_ACTIONS)
+    )),
+]
 
 urlpatterns = [
     path('api/', include(router.urls)),
     path('api/', include('djoser.urls')),
-    path('api/auth/', include('djoser.urls.authtoken')),
+    path('api/auth/token/login/', TokenLoginView.as_view(), name='login'),
+    path('api/auth/token/logout/', TokenLogoutView.as_view(), name='logout'),
+    path('api/auth/', include('djoser.urls.jwt')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
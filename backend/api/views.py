@@ -1,35 +1,77 @@
 from django.contrib.auth import get_user_model
-from django.db.models import BooleanField, Count, Exists, OuterRef, Sum, Value
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.db.models import (BooleanField, Count, Exists, OuterRef, Q, Sum,
+                              Value)
+from django.http import Http404, HttpResponse, HttpResponsePermanentRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-
-from recipes.models import (Favorite, Follow, Ingredient, Recipe,
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenViewBase
+
+from recipes import counts, feed, shortlinks, toggles
+from recipes.models import (Favorite, FeedEntry, Follow, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
 
+from . import authentication
 from .filters import IngredientFilter, RecipeFilter
+from .mixins import ProfilingMixin, ReplicaReadMixin
+from .pagination import CachedCountPagination
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (AvatarSerializer, FavoriteSerializer,
-                          FollowSerializer, IngredientSerializer,
-                          RecipeSerializer, ShoppingCartSerializer,
-                          TagSerializer, UserSerializer, UserSerializerForMe)
+from .serializers import (AvatarSerializer, FollowSerializer,
+                          IngredientSerializer, RecipeSerializer,
+                          TagFacetSerializer, TagSerializer,
+                          TokenLoginSerializer, UserSerializer,
+                          UserSerializerForMe, sparse_fields)
 
 User = get_user_model()
 
+# Поля UserSerializer, которые хранятся в таблице пользователей.
+USER_COLUMNS = {'email', 'username', 'first_name', 'last_name', 'avatar'}
+
+
+class TokenLoginView(TokenViewBase):
+    """Выдаёт access-токен по email и паролю."""
+
+    serializer_class = TokenLoginSerializer
+
 
-class UserViewSet(DjoserUserViewSet):
+class TokenLogoutView(APIView):
+    """Отзывает текущий access-токен и, если передан, refresh-токен."""
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        authentication.revoke(request.auth)
+        if request.data.get('refresh'):
+            try:
+                refresh = RefreshToken(request.data['refresh'])
+            except TokenError as error:
+                return Response(
+                    {'refresh': [str(error)]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if refresh[jwt_settings.USER_ID_CLAIM] == str(request.user.id):
+                refresh.blacklist()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserViewSet(ProfilingMixin, DjoserUserViewSet):
     """Вьюсет для управления пользователями."""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
     lookup_field = 'pk'
 
     def get_serializer_class(self):
@@ -38,6 +80,15 @@ class UserViewSet(DjoserUserViewSet):
             return UserSerializerForMe
         return super().get_serializer_class()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        fields = sparse_fields(self.request, UserSerializer)
+        if fields is None:
+            return queryset
+        return queryset.only(*USER_COLUMNS & fields, 'id')
+
     @action(
         detail=False,
         methods=['get'],
@@ -54,7 +105,7 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscriptions(self, request):
         """Список подписок текущего пользователя (с пагинацией)."""
-        queryset = Follow.objects.filter(user=request.user).annotate(
+        queryset = Follow.objects.filter(user_id=request.user.id).annotate(
             recipes_count=Count('following__recipes')
         )
         page = self.paginate_queryset(queryset)
@@ -73,31 +124,38 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscribe(self, request, pk=None, **kwargs):
         """Подписка или отписка от пользователя."""
-        user_to_follow = get_object_or_404(User, pk=pk)
+        author_id = parse_pk(User, pk)
 
         if request.method == 'POST':
-            serializer = FollowSerializer(
-                data={'following': user_to_follow.id},
-                context={
-                    'request': request,
-                    'following_user': user_to_follow
-                }
-            )
-            serializer.is_valid(raise_exception=True)
-            follow_obj = serializer.save()
+            if author_id == request.user.id:
+                return Response(
+                    {'non_field_errors': [
+                        'Нельзя подписаться на самого себя.'
+                    ]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            author, created = toggles.follow(request.user.id, author_id)
+            if author is None:
+                raise Http404
+            if not created:
+                return Response(
+                    {'non_field_errors': [
+                        'Вы уже подписаны на этого пользователя.'
+                    ]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            follow = Follow(user_id=request.user.id, following=author)
+            follow.recipes_count = author.recipes_count
             return Response(
-                FollowSerializer(
-                    follow_obj, context={'request': request}
-                ).data,
+                FollowSerializer(follow, context={
+                    'request': request,
+                    'subscribed_ids': {author.id},
+                }).data,
                 status=status.HTTP_201_CREATED
             )
 
-        follow_qs = Follow.objects.filter(
-            user=request.user,
-            following=user_to_follow
-        )
-        deleted, _ = follow_qs.delete()
-        if deleted == 0:
+        if not toggles.unfollow(request.user.id, author_id):
+            get_object_or_404(User, pk=author_id)
             return Response(
                 {'error': 'Вы не подписаны на этого пользователя.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -134,7 +192,9 @@ class UserViewSet(DjoserUserViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ProfilingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet
+):
     """Просмотр тегов."""
 
     queryset = Tag.objects.all()
@@ -143,7 +203,9 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ProfilingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet
+):
     """Просмотр ингредиентов."""
 
     queryset = Ingredient.objects.all()
@@ -154,51 +216,99 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ProfilingMixin, ReplicaReadMixin, viewsets.ModelViewSet
+):
     """Управление рецептами (создание, получение, редактирование, удаление)."""
 
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthorOrReadOnly]
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Recipe.objects.select_related('author').prefetch_related(
-            'tags',
-            'ingredient_amounts__ingredient'
+        return recipe_queryset(
+            self.request.user,
+            sparse_fields(self.request, RecipeSerializer),
         )
-        if user.is_authenticated:
-            queryset = queryset.annotate(
-                is_favorited=Exists(
-                    Favorite.objects.filter(
-                        user=user,
-                        recipe=OuterRef('pk')
-                    )
-                ),
-                is_in_shopping_cart=Exists(
-                    ShoppingCart.objects.filter(
-                        user=user,
-                        recipe=OuterRef('pk')
-                    )
-                )
-            )
-        else:
-            queryset = queryset.annotate(
-                is_favorited=Value(
-                    False, output_field=BooleanField()
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self.request.method == 'GET':
+            recipes = args[0] if kwargs.get('many') else [args[0]]
+            kwargs['context'] = {
+                **self.get_serializer_context(),
+                'subscribed_ids': subscribed_author_ids(
+                    self.request.user, recipes,
+                    sparse_fields(self.request, RecipeSerializer),
                 ),
-                is_in_shopping_cart=Value(
-                    False, output_field=BooleanField()
-                )
-            )
-        return queryset
+            }
+        return super().get_serializer(*args, **kwargs)
 
     def perform_create(self, serializer):
         """Создаёт рецепт, устанавливая текущего пользователя автором."""
-        serializer.save(author=self.request.user)
+        serializer.save(author_id=self.request.user.id)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        timeline = Q(feed_entries__user_id=request.user.id)
+        pull_authors = feed.pull_author_ids(request.user)
+        if pull_authors:
+            timeline = Q(
+                id__in=FeedEntry.objects.filter(
+                    user_id=request.user.id
+                ).values('recipe_id')
+            ) | Q(author__in=pull_authors)
+        queryset = self.filter_queryset(self.get_queryset().filter(timeline))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Рецепты, которые чаще всего добавляют в последнее время."""
+        queryset = self.filter_queryset(
+            self.get_queryset().filter(trending__isnull=False)
+        ).order_by('-trending__score')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Число рецептов по тегам для текущих фильтров.
+
+        Фильтр по тегам не учитывается: счётчик тега показывает, сколько
+        рецептов найдётся с этим тегом при остальных фильтрах.
+        """
+        params = request.query_params.copy()
+        params.pop('tags', None)
+        filterset = RecipeFilter(
+            params, queryset=Recipe.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return Response(TagFacetSerializer(
+            counts.tag_facets(filterset.qs), many=True
+        ).data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Рецепты с наиболее похожим набором ингредиентов."""
+        recipe = get_object_or_404(
+            Recipe.objects.only('id'), pk=parse_pk(Recipe, pk)
+        )
+        queryset = self.get_queryset().filter(
+            neighbor_of__recipe_id=recipe.id
+        ).order_by('-neighbor_of__score')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
     @action(
         detail=True,
@@ -207,12 +317,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk=None):
         """Добавление/удаление рецепта в избранное."""
-        recipe = get_object_or_404(Recipe, pk=pk)
         return handle_add_remove(
             request,
-            recipe,
+            parse_pk(Recipe, pk),
             model=Favorite,
-            serializer_class=FavoriteSerializer,
             error_exists='Рецепт уже в избранном',
             error_not_found='Рецепт не найден в избранном'
         )
@@ -224,12 +332,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk=None):
         """Добавление/удаление рецепта в список покупок."""
-        recipe = get_object_or_404(Recipe, pk=pk)
         return handle_add_remove(
             request,
-            recipe,
+            parse_pk(Recipe, pk),
             model=ShoppingCart,
-            serializer_class=ShoppingCartSerializer,
             error_exists='Рецепт уже в списке покупок',
             error_not_found='Рецепт не найден в списке покупок'
         )
@@ -242,11 +348,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_link(self, request, pk=None):
         """Возврат короткой ссылки на рецепт."""
-        recipe = self.get_object()
-        relative_url = reverse('recipe-detail', kwargs={'pk': recipe.pk})
-        absolute_url = request.build_absolute_uri(relative_url)
+        recipe_id = parse_pk(Recipe, pk)
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            raise NotFound()
+        try:
+            code = shortlinks.encode(recipe_id)
+        except ValueError:
+            raise NotFound()
+        relative_url = reverse('short-link', kwargs={'code': code})
         return Response(
-            {'short-link': absolute_url},
+            {'short-link': request.build_absolute_uri(relative_url)},
             status=status.HTTP_200_OK
         )
 
@@ -259,7 +370,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def download_shopping_cart(self, request):
         """Выгрузка списка покупок в файл с указанием рецептов и суммированием
         одинаковых ингредиентов."""
-        recipes = Recipe.objects.filter(shoppingcart_by__user=request.user)
+        recipes = Recipe.objects.filter(
+            shoppingcart_by__user_id=request.user.id
+        )
         ingredients = RecipeIngredient.objects.filter(
             recipe__in=recipes
         ).values(
@@ -286,6 +399,50 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return response
 
 
+def recipe_queryset(user, fields=None):
+    """Рецепты с данными, которые нужны RecipeSerializer.
+
+    fields — поля ответа из sparse_fields: связи и аннотации для
+    остальных полей не загружаются.
+    """
+    if fields is None:
+        fields = set(RecipeSerializer.Meta.fields)
+    queryset = Recipe.objects.all()
+    if 'author' in fields:
+        queryset = queryset.select_related('author')
+    if 'text' not in fields:
+        queryset = queryset.defer('text')
+    if 'tags' in fields:
+        queryset = queryset.prefetch_related('tags')
+    if 'ingredients' in fields:
+        queryset = queryset.prefetch_related('ingredient_amounts__ingredient')
+    relations = {
+        'is_favorited': Favorite,
+        'is_in_shopping_cart': ShoppingCart,
+    }
+    return queryset.annotate(**{
+        name: Exists(model.objects.filter(
+            user_id=user.id, recipe=OuterRef('pk')
+        )) if user.is_authenticated else Value(
+            False, output_field=BooleanField()
+        )
+        for name, model in relations.items() if name in fields
+    })
+
+
+def subscribed_author_ids(user, recipes, fields=None):
+    """id авторов рецептов, на которых подписан пользователь, одним
+    запросом вместо проверки подписки для каждого рецепта."""
+    if not user.is_authenticated or (
+        fields is not None and 'author' not in fields
+    ):
+        return set()
+    return set(Follow.objects.filter(
+        user_id=user.id,
+        following_id__in={recipe.author_id for recipe in recipes}
+    ).values_list('following_id', flat=True))
+
+
 def render_ingredients_txt(ingredients_totals, recipes_used):
     lines = ['Список покупок:']
     lines.append('\nИспользуемые рецепты:')
@@ -297,17 +454,28 @@ def render_ingredients_txt(ingredients_totals, recipes_used):
     return '\n'.join(lines)
 
 
-def handle_add_remove(
-    request, recipe, model, serializer_class, error_exists, error_not_found
-):
+def parse_pk(model, pk):
+    try:
+        return model._meta.pk.to_python(pk)
+    except ValidationError:
+        raise Http404
+
+
+def handle_add_remove(request, recipe_id, model, error_exists,
+                      error_not_found):
+    """Добавляет или удаляет связь пользователя с рецептом одним
+    запросом к базе (см. recipes.toggles)."""
     if request.method == 'POST':
-        serializer = serializer_class(
-            data={'recipe': recipe.id},
-            context={'request': request}
+        recipe, created = toggles.add_recipe(
+            model, request.user.id, recipe_id
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-
+        if recipe is None:
+            raise Http404
+        if not created:
+            return Response(
+                {'error': error_exists},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         data = {
             'id': recipe.id,
             'name': recipe.name,
@@ -320,11 +488,19 @@ def handle_add_remove(
         return Response(data, status=status.HTTP_201_CREATED)
 
     if request.method == 'DELETE':
-        qs = model.objects.filter(user=request.user, recipe=recipe)
-        deleted, _ = qs.delete()
-        if deleted == 0:
+        if not toggles.remove_recipe(model, request.user.id, recipe_id):
+            get_object_or_404(Recipe, pk=recipe_id)
             return Response(
                 {'error': error_not_found},
                 status=status.HTTP_400_BAD_REQUEST
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def short_link_redirect(request, code):
+    """Переход по короткой ссылке на страницу рецепта во фронтенде."""
+    try:
+        recipe_id = shortlinks.decode(code)
+    except ValueError:
+        raise Http404('Неизвестная короткая ссылка.')
+    return HttpResponsePermanentRedirect(f'/recipes/{recipe_id}')
@@ -2,6 +2,12 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from config import warmup
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+with warmup.stage('django_setup'):
+    application = get_asgi_application()
+
+if warmup.enabled():
+    warmup.warm_up()
@@ -0,0 +1,45 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = 'replica'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def use_replica():
+    """Направляет чтения текущего запроса в реплику."""
+    return _read_from_replica.set(True)
+
+
+def release(token):
+    _read_from_replica.reset(token)
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """Закрепляет чтения пользователя за основной базой после записи."""
+    cache.set(pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(pin_key(user.pk), False)
+
+
+class PrimaryReplicaRouter:
+    """Чтения из помеченных запросов идут в реплику, записи — в основную."""
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
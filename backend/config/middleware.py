@@ -0,0 +1,154 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.db import connections
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+
+from api import throttling
+from config import db_router, warmup
+
+
+class HybridMiddleware:
+    """Основа для middleware, работающих и под WSGI, и под ASGI.
+
+    Синхронный middleware в ASGI-режиме заставил бы Django выполнять
+    асинхронные вьюхи в отдельном потоке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        return self.get_response(request)
+
+    async def acall(self, request):
+        return await self.get_response(request)
+
+
+class ReadYourWritesMiddleware(HybridMiddleware):
+    """После успешной записи закрепляет чтения пользователя за основной БД."""
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        response = self.get_response(request)
+        if self.wrote(request, response):
+            db_router.pin_to_primary(request.user)
+        return response
+
+    async def acall(self, request):
+        response = await self.get_response(request)
+        if self.wrote(request, response):
+            await sync_to_async(db_router.pin_to_primary)(request.user)
+        return response
+
+    def wrote(self, request, response):
+        user = getattr(request, 'user', None)
+        return (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        )
+
+
+class FirstRequestTimingMiddleware(HybridMiddleware):
+    """Пишет в лог длительность первого запроса процесса."""
+
+    served = False
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        if self.served:
+            return self.get_response(request)
+        self.served = True
+        with warmup.stage('first_request'):
+            response = self.get_response(request)
+        warmup.report('first request')
+        return response
+
+    async def acall(self, request):
+        if self.served:
+            return await self.get_response(request)
+        self.served = True
+        with warmup.stage('first_request'):
+            response = await self.get_response(request)
+        warmup.report('first request')
+        return response
+
+
+class QueryTimer:
+    """Считает SQL-запросы и время их выполнения на всех подключениях."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def installed(self):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+class RequestCostMiddleware(HybridMiddleware):
+    """Измеряет стоимость запроса для CostThrottle.
+
+    Учитываются время в базе, процессорное время и размер запроса и
+    ответа. Стоимость отдаётся в заголовке X-Request-Cost.
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        timer = QueryTimer()
+        cpu_started = time.thread_time()
+        with timer.installed():
+            response = self.get_response(request)
+        self.record(
+            request, response, timer.seconds,
+            time.thread_time() - cpu_started,
+        )
+        return response
+
+    async def acall(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with timer.installed():
+            response = await self.get_response(request)
+        # Поток цикла событий делят все запросы, поэтому под ASGI
+        # процессорное время оценивается как время без ожидания базы.
+        cpu_seconds = max(time.perf_counter() - started - timer.seconds, 0)
+        await sync_to_async(self.record)(
+            request, response, timer.seconds, cpu_seconds
+        )
+        return response
+
+    def record(self, request, response, db_seconds, cpu_seconds):
+        payload = int(request.META.get('CONTENT_LENGTH') or 0)
+        if not response.streaming:
+            payload += len(response.content)
+        cost = throttling.measure(request, db_seconds, cpu_seconds, payload)
+        # Отклонённые запросы дёшевы и занизили бы оценку эндпоинта.
+        if response.status_code != status.HTTP_429_TOO_MANY_REQUESTS:
+            throttling.record(request, cost)
+        response['X-Request-Cost'] = f'{cost:.1f}'
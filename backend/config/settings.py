@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -21,15 +22,20 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
-    'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'djoser',
     'django_filters',
     'recipes.apps.RecipesConfig',
     'api',
+    'tasks',
+    'profiling',
 ]
 
 MIDDLEWARE = [
+    'config.middleware.FirstRequestTimingMiddleware',
+    'config.middleware.RequestCostMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.middleware.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -59,17 +66,57 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# wsgi — синхронные воркеры gunicorn, asgi — воркеры uvicorn
+# с асинхронными read-only эндпоинтами.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+ASYNC_READ_VIEWS = SERVER_MODE == 'asgi'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Под ASGI соединения живут в потоках sync_to_async, поэтому
+        # постоянные соединения включаются только для WSGI.
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE', 60 if SERVER_MODE == 'wsgi' else 0
+        )),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['config.db_router.PrimaryReplicaRouter']
+
+# Сколько секунд после записи чтения пользователя идут в основную базу.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Кеш, который видят все воркеры и процесс задач.
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
 AUTH_USER_MODEL = 'recipes.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -101,6 +148,51 @@ STATIC_ROOT = '/backend_static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Где хранятся картинки рецептов и аватары: local — в MEDIA_ROOT,
+# s3 — в S3-совместимом хранилище, memory — в памяти процесса (тесты).
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'local')
+MEDIA_STORAGE_BACKENDS = {
+    'local': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'memory': {
+        'BACKEND': 'django.core.files.storage.InMemoryStorage',
+    },
+    's3': {
+        'BACKEND': 'config.storage.MediaS3Storage',
+        'OPTIONS': {
+            'bucket_name': os.getenv('S3_BUCKET', 'foodgram-media'),
+            'location': os.getenv('S3_LOCATION', 'media'),
+            'endpoint_url': os.getenv('S3_ENDPOINT_URL') or None,
+            'region_name': os.getenv('S3_REGION') or None,
+            'access_key': os.getenv('S3_ACCESS_KEY') or None,
+            'secret_key': os.getenv('S3_SECRET_KEY') or None,
+            'addressing_style': os.getenv('S3_ADDRESSING_STYLE') or None,
+            # Домен CDN или публичного бакета для ссылок на файлы.
+            'custom_domain': os.getenv('MEDIA_CDN_DOMAIN') or None,
+            'querystring_auth': os.getenv('S3_SIGNED_URLS', 'False') == 'True',
+            'file_overwrite': False,
+            'object_parameters': {
+                'CacheControl': os.getenv(
+                    'MEDIA_CACHE_CONTROL', 'public, max-age=604800'
+                ),
+            },
+            'multipart_threshold': int(
+                os.getenv('S3_MULTIPART_THRESHOLD_MB', 8)
+            ) * 1024 * 1024,
+            'multipart_chunksize': int(
+                os.getenv('S3_MULTIPART_CHUNK_MB', 8)
+            ) * 1024 * 1024,
+        },
+    },
+}
+STORAGES = {
+    'default': MEDIA_STORAGE_BACKENDS[MEDIA_STORAGE],
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
@@ -108,17 +200,81 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.CostThrottle',
+    ],
+    # Адрес клиента для ограничения частоты берётся из X-Forwarded-For,
+    # который выставляет nginx; 0 — приложение принимает запросы напрямую.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+}
+
+# Выполнять фоновые задачи сразу, без очереди и воркера run_tasks.
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False') == 'True'
+TASKS_POLL_INTERVAL = float(os.getenv('TASKS_POLL_INTERVAL', 1))
+# Задачи, которые выполняются дольше, считаются брошенными воркером.
+TASKS_TIMEOUT = int(os.getenv('TASKS_TIMEOUT', 600))
+
+# Доля запросов к API, для которых снимается профиль cProfile.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+# Эндпоинты вида RecipeViewSet.create, для которых снимается профиль памяти.
+MEMORY_PROFILING_ENDPOINTS = [
+    endpoint for endpoint in os.getenv(
+        'MEMORY_PROFILING_ENDPOINTS', ''
+    ).split(',') if endpoint
+]
+
+THROTTLE_WINDOW = int(os.getenv('THROTTLE_WINDOW', 60))
+THROTTLE_BUDGETS = {
+    'user': int(os.getenv('THROTTLE_USER_BUDGET', 600)),
+    'anon': int(os.getenv('THROTTLE_ANON_BUDGET', 200)),
+    'ip': int(os.getenv('THROTTLE_IP_BUDGET', 1200)),
+}
+THROTTLE_HEAVY_COST = int(os.getenv('THROTTLE_HEAVY_COST', 20))
+THROTTLE_MAX_CONCURRENT = int(os.getenv('THROTTLE_MAX_CONCURRENT', 2))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'config': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+        'tasks': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        hours=int(os.getenv('JWT_ACCESS_HOURS', 24))
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('JWT_REFRESH_DAYS', 30))
+    ),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'AUTH_HEADER_TYPES': ('Token', 'Bearer'),
+    'TOKEN_OBTAIN_SERIALIZER': (
+        'api.serializers.ClaimsTokenObtainPairSerializer'
+    ),
 }
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
+    'TOKEN_MODEL': None,
     'USER_LIST': True,
     'USER_CREATE': 'recipes.serializers.CreateUserSerializer',
     'USER': 'recipes.serializers.UserSerializer',
@@ -0,0 +1,19 @@
+"""Хранилище медиафайлов в S3-совместимом объектном хранилище.
+
+Используется при MEDIA_STORAGE=s3. Файлы больше порога загружаются
+многочастной загрузкой частями по multipart_chunksize байт, поэтому
+большой файл не нужно целиком держать в одном запросе к хранилищу.
+"""
+from boto3.s3.transfer import TransferConfig
+from storages.backends.s3 import S3Storage
+
+
+class MediaS3Storage(S3Storage):
+
+    def __init__(self, multipart_threshold=8 * 1024 * 1024,
+                 multipart_chunksize=8 * 1024 * 1024, **settings):
+        settings.setdefault('transfer_config', TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+        ))
+        super().__init__(**settings)
@@ -3,12 +3,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.views import short_link_redirect
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('s/<str:code>/', short_link_redirect, name='short-link'),
     path('', include('api.urls')),
 ]
 
-if settings.DEBUG:
+if settings.DEBUG and settings.MEDIA_STORAGE == 'local':
     urlpatterns += static(
         settings.MEDIA_URL,
         document_root=settings.MEDIA_ROOT
@@ -0,0 +1,137 @@
+"""Прогрев процесса до приёма первых запросов.
+
+Всё, что Django и DRF обычно строят лениво на первом запросе, строится
+здесь. При preload_app в gunicorn это происходит в мастер-процессе,
+и воркеры получают готовые структуры через copy-on-write.
+"""
+import importlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+started = time.perf_counter()
+timings = {}
+
+WARMUP_MODULES = (
+    'djoser.views',
+    'djoser.urls',
+    'djoser.urls.jwt',
+    'djoser.serializers',
+    'django_filters.rest_framework',
+    'rest_framework_simplejwt.tokens',
+    'api.authentication',
+    'api.views',
+    'api.async_views',
+    'api.serializers',
+    'api.filters',
+)
+
+WARMUP_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/1/',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/users/',
+    '/api/users/me/',
+    '/api/auth/token/login/',
+)
+
+DRF_SETTINGS = (
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_FILTER_BACKENDS',
+    'DEFAULT_PAGINATION_CLASS',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    'DEFAULT_METADATA_CLASS',
+    'DEFAULT_VERSIONING_CLASS',
+    'DEFAULT_THROTTLE_CLASSES',
+    'EXCEPTION_HANDLER',
+)
+
+
+def reset():
+    """Начинает отсчёт заново, например в воркере после fork."""
+    global started
+    started = time.perf_counter()
+    timings.clear()
+
+
+def enabled():
+    return os.getenv('WARMUP', 'True') == 'True'
+
+
+@contextmanager
+def stage(name):
+    stage_started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - stage_started
+
+
+def warm_up():
+    """Импортирует и строит лениво создаваемые структуры."""
+    from django.urls import get_resolver, resolve
+    from rest_framework.settings import api_settings
+
+    with stage('imports'):
+        for module in WARMUP_MODULES:
+            importlib.import_module(module)
+    with stage('urls'):
+        get_resolver().url_patterns
+        for path in WARMUP_PATHS:
+            resolve(path)
+    with stage('drf_settings'):
+        for name in DRF_SETTINGS:
+            getattr(api_settings, name)
+    with stage('serializers'):
+        from api import serializers
+        for serializer_class in (
+            serializers.RecipeSerializer,
+            serializers.UserSerializer,
+            serializers.UserSerializerForMe,
+            serializers.FollowSerializer,
+            serializers.IngredientSerializer,
+            serializers.TagSerializer,
+            serializers.AvatarSerializer,
+        ):
+            serializer_class().fields
+    with stage('filters'):
+        from api import filters
+        filters.RecipeFilter.base_filters
+        filters.IngredientFilter.base_filters
+    report('warm-up')
+
+
+def connect_databases():
+    """Открывает соединения с базами в воркере после fork."""
+    from django.db import connections
+
+    with stage('db_connect'):
+        for connection in connections.all():
+            connection.ensure_connection()
+
+
+def close_databases():
+    """Закрывает соединения, чтобы они не достались воркерам при fork."""
+    from django.db import connections
+
+    connections.close_all()
+
+
+def report(event):
+    logger.info(
+        '%s (pid %s): %s, since start %.1f ms',
+        event,
+        os.getpid(),
+        ', '.join(
+            f'{name} {seconds * 1000:.1f} ms'
+            for name, seconds in timings.items()
+        ),
+        (time.perf_counter() - started) * 1000,
+    )
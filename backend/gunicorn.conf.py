@@ -0,0 +1,25 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+# Приложение загружается и прогревается в мастере до fork, воркеры
+# разделяют его память по copy-on-write.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+
+
+def pre_fork(server, worker):
+    from config import warmup
+    warmup.close_databases()
+
+
+def post_fork(server, worker):
+    from config import warmup
+    warmup.reset()
+    if preload_app and warmup.enabled():
+        warmup.connect_databases()
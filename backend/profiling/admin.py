@@ -0,0 +1,24 @@
+from django.contrib import admin
+
+from .models import AllocationProfile, RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created', 'endpoint', 'method', 'status_code',
+                    'duration', 'query_count')
+    list_filter = ('endpoint', 'method')
+    exclude = ('stats',)
+    readonly_fields = ('endpoint', 'method', 'path', 'query_string', 'user',
+                       'status_code', 'duration', 'db_time', 'query_count',
+                       'created')
+
+
+@admin.register(AllocationProfile)
+class AllocationProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created', 'endpoint', 'method', 'status_code',
+                    'peak', 'net')
+    list_filter = ('endpoint', 'method')
+    readonly_fields = ('endpoint', 'method', 'path', 'query_string', 'user',
+                       'status_code', 'duration', 'peak', 'net', 'top',
+                       'created')
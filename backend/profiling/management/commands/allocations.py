@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from profiling.models import AllocationProfile
+
+
+def source(filename, lineno, width=60):
+    location = f'{filename}:{lineno}'
+    if len(location) > width:
+        location = '…' + location[-width + 1:]
+    return location
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает сохранённые профили памяти: список, сводку по '
+        'эндпоинтам или строки кода, выделяющие больше всего памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint', help='Например RecipeViewSet.download_shopping_cart'
+        )
+        parser.add_argument('--hours', type=float, default=24)
+        parser.add_argument(
+            '--summary', action='store_true',
+            help='Сводка по эндпоинтам вместо списка профилей',
+        )
+        parser.add_argument(
+            '--top', nargs='*', type=int, metavar='ID',
+            help='Сложить строки кода профилей с этими id, а без id — '
+                 'всех выбранных профилей',
+        )
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument(
+            '--delete-older-than', type=float, metavar='DAYS',
+            help='Удалить профили старше указанного числа дней',
+        )
+
+    def handle(self, *args, **options):
+        if options['delete_older_than'] is not None:
+            deleted, _ = AllocationProfile.objects.filter(
+                created__lt=timezone.now() - timedelta(
+                    days=options['delete_older_than']
+                )
+            ).delete()
+            self.stdout.write(f'Удалено профилей: {deleted}')
+            return
+        profiles = AllocationProfile.objects.filter(
+            created__gte=timezone.now() - timedelta(hours=options['hours'])
+        )
+        if options['endpoint']:
+            profiles = profiles.filter(endpoint=options['endpoint'])
+        if options['top'] is not None:
+            self.print_top(profiles, options)
+        elif options['summary']:
+            self.print_summary(profiles)
+        else:
+            self.print_list(profiles, options['limit'])
+
+    def print_list(self, profiles, limit):
+        self.stdout.write(
+            f'{"id":>6} {"created":19} {"endpoint":36} {"ms":>8} '
+            f'{"peak KB":>9} {"net KB":>9}  query'
+        )
+        for profile in profiles.defer('top')[:limit]:
+            self.stdout.write(
+                f'{profile.id:>6} '
+                f'{profile.created:%Y-%m-%d %H:%M:%S} '
+                f'{profile.endpoint[:36]:36} '
+                f'{profile.duration * 1000:>8.1f} '
+                f'{profile.peak / 1024:>9.1f} '
+                f'{profile.net / 1024:>9.1f}  {profile.query_string}'
+            )
+
+    def print_summary(self, profiles):
+        self.stdout.write(
+            f'{"endpoint":40} {"count":>6} {"avg peak KB":>12} '
+            f'{"max peak KB":>12} {"avg net KB":>11}'
+        )
+        for row in profiles.values('endpoint').annotate(
+            count=Count('id'),
+            avg_peak=Avg('peak'),
+            max_peak=Max('peak'),
+            avg_net=Avg('net'),
+        ).order_by('-avg_peak'):
+            self.stdout.write(
+                f'{row["endpoint"][:40]:40} {row["count"]:>6} '
+                f'{row["avg_peak"] / 1024:>12.1f} '
+                f'{row["max_peak"] / 1024:>12.1f} '
+                f'{row["avg_net"] / 1024:>11.1f}'
+            )
+
+    def print_top(self, profiles, options):
+        if options['top']:
+            profiles = AllocationProfile.objects.filter(pk__in=options['top'])
+        sizes = defaultdict(int)
+        blocks = defaultdict(int)
+        count = 0
+        for top in profiles.values_list('top', flat=True).iterator():
+            count += 1
+            for filename, lineno, size, allocated in top:
+                sizes[filename, lineno] += size
+                blocks[filename, lineno] += allocated
+        if not count:
+            raise CommandError('Профили не найдены')
+        self.stdout.write(f'Профилей: {count}')
+        self.stdout.write(
+            f'{"avg KB":>10} {"blocks":>8}  source'
+        )
+        for line in sorted(sizes, key=sizes.get, reverse=True)[
+            :options['limit']
+        ]:
+            self.stdout.write(
+                f'{sizes[line] / count / 1024:>10.1f} '
+                f'{blocks[line] // count:>8}  {source(*line)}'
+            )
@@ -0,0 +1,107 @@
+import io
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from profiling.models import RequestProfile
+from profiling.profiler import load_stats
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает сохранённые профили запросов: список, сводку по '
+        'эндпоинтам или самые дорогие функции'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', help='Например RecipeViewSet.list')
+        parser.add_argument('--hours', type=float, default=24)
+        parser.add_argument(
+            '--summary', action='store_true',
+            help='Сводка по эндпоинтам вместо списка профилей',
+        )
+        parser.add_argument(
+            '--stats', nargs='*', type=int, metavar='ID',
+            help='Сложить статистику профилей с этими id, а без id — '
+                 'всех выбранных профилей',
+        )
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative')
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument(
+            '--delete-older-than', type=float, metavar='DAYS',
+            help='Удалить профили старше указанного числа дней',
+        )
+
+    def handle(self, *args, **options):
+        if options['delete_older_than'] is not None:
+            deleted, _ = RequestProfile.objects.filter(
+                created__lt=timezone.now() - timedelta(
+                    days=options['delete_older_than']
+                )
+            ).delete()
+            self.stdout.write(f'Удалено профилей: {deleted}')
+            return
+        profiles = RequestProfile.objects.filter(
+            created__gte=timezone.now() - timedelta(hours=options['hours'])
+        )
+        if options['endpoint']:
+            profiles = profiles.filter(endpoint=options['endpoint'])
+        if options['stats'] is not None:
+            self.print_stats(profiles, options)
+        elif options['summary']:
+            self.print_summary(profiles)
+        else:
+            self.print_list(profiles, options['limit'])
+
+    def print_list(self, profiles, limit):
+        self.stdout.write(
+            f'{"id":>6} {"created":19} {"endpoint":36} {"ms":>8} '
+            f'{"db ms":>8} {"sql":>5}  query'
+        )
+        for profile in profiles.defer('stats')[:limit]:
+            self.stdout.write(
+                f'{profile.id:>6} '
+                f'{profile.created:%Y-%m-%d %H:%M:%S} '
+                f'{profile.endpoint[:36]:36} '
+                f'{profile.duration * 1000:>8.1f} '
+                f'{profile.db_time * 1000:>8.1f} '
+                f'{profile.query_count:>5}  {profile.query_string}'
+            )
+
+    def print_summary(self, profiles):
+        self.stdout.write(
+            f'{"endpoint":40} {"count":>6} {"avg ms":>8} {"max ms":>8} '
+            f'{"db ms":>8} {"sql":>6}'
+        )
+        for row in profiles.values('endpoint').annotate(
+            count=Count('id'),
+            avg=Avg('duration'),
+            max=Max('duration'),
+            db=Avg('db_time'),
+            queries=Avg('query_count'),
+        ).order_by('-avg'):
+            self.stdout.write(
+                f'{row["endpoint"][:40]:40} {row["count"]:>6} '
+                f'{row["avg"] * 1000:>8.1f} {row["max"] * 1000:>8.1f} '
+                f'{row["db"] * 1000:>8.1f} {row["queries"]:>6.1f}'
+            )
+
+    def print_stats(self, profiles, options):
+        if options['stats']:
+            profiles = RequestProfile.objects.filter(pk__in=options['stats'])
+        blobs = [bytes(blob) for blob in profiles.values_list(
+            'stats', flat=True
+        ).iterator()]
+        if not blobs:
+            raise CommandError('Профили не найдены')
+        output = io.StringIO()
+        stats = load_stats(blobs, stream=output)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(
+            options['limit']
+        )
+        self.stdout.write(f'Профилей: {len(blobs)}')
+        self.stdout.write(output.getvalue())
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.19 on 2026-10-19 09:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=200, verbose_name='Эндпоинт')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=500, verbose_name='Путь')),
+                ('query_string', models.TextField(blank=True, verbose_name='Параметры')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('duration', models.FloatField(verbose_name='Длительность, с')),
+                ('db_time', models.FloatField(verbose_name='Время в базе, с')),
+                ('query_count', models.PositiveIntegerField(verbose_name='Запросов к базе')),
+                ('stats', models.BinaryField(verbose_name='Статистика cProfile')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Снят')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-created'],
+                'indexes': [models.Index(fields=['endpoint', 'created'], name='profile_endpoint_idx')],
+            },
+        ),
+    ]
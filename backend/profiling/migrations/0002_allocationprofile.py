@@ -0,0 +1,39 @@
+# Generated by Django 4.2.19 on 2026-10-19 09:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('profiling', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllocationProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=200, verbose_name='Эндпоинт')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=500, verbose_name='Путь')),
+                ('query_string', models.TextField(blank=True, verbose_name='Параметры')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('duration', models.FloatField(verbose_name='Длительность, с')),
+                ('peak', models.BigIntegerField(verbose_name='Пик памяти, байт')),
+                ('net', models.BigIntegerField(verbose_name='Не освобождено к концу запроса, байт')),
+                ('top', models.JSONField(default=list, help_text='Список [файл, строка, байт, блоков].', verbose_name='Строки кода с наибольшим объёмом памяти')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Снят')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль памяти',
+                'verbose_name_plural': 'Профили памяти',
+                'ordering': ['-created'],
+                'indexes': [models.Index(fields=['endpoint', 'created'], name='allocation_endpoint_idx')],
+            },
+        ),
+    ]
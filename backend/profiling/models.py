@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    endpoint = models.CharField(max_length=200, verbose_name='Эндпоинт')
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=500, verbose_name='Путь')
+    query_string = models.TextField(blank=True, verbose_name='Параметры')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    status_code = models.PositiveSmallIntegerField(verbose_name='Статус')
+    duration = models.FloatField(verbose_name='Длительность, с')
+    db_time = models.FloatField(verbose_name='Время в базе, с')
+    query_count = models.PositiveIntegerField(verbose_name='Запросов к базе')
+    stats = models.BinaryField(verbose_name='Статистика cProfile')
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Снят')
+
+    class Meta:
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['endpoint', 'created'], name='profile_endpoint_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration * 1000:.0f} мс)'
+
+
+class AllocationProfile(models.Model):
+    endpoint = models.CharField(max_length=200, verbose_name='Эндпоинт')
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=500, verbose_name='Путь')
+    query_string = models.TextField(blank=True, verbose_name='Параметры')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    status_code = models.PositiveSmallIntegerField(verbose_name='Статус')
+    duration = models.FloatField(verbose_name='Длительность, с')
+    peak = models.BigIntegerField(verbose_name='Пик памяти, байт')
+    net = models.BigIntegerField(
+        verbose_name='Не освобождено к концу запроса, байт'
+    )
+    top = models.JSONField(
+        default=list,
+        verbose_name='Строки кода с наибольшим объёмом памяти',
+        help_text='Список [файл, строка, байт, блоков].',
+    )
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Снят')
+
+    class Meta:
+        verbose_name = 'Профиль памяти'
+        verbose_name_plural = 'Профили памяти'
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['endpoint', 'created'],
+                name='allocation_endpoint_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.method} {self.path} (пик {self.peak} байт)'
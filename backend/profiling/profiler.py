@@ -0,0 +1,143 @@
+"""Профилирование обработки запросов к API.
+
+Профиль cProfile снимается, если сотрудник прислал заголовок X-Profile,
+или случайно с вероятностью PROFILING_SAMPLE_RATE. Статистика хранится в
+формате pstats (marshal), поэтому профили одного эндпоинта можно
+складывать и смотреть стандартными средствами Python.
+
+Профиль памяти (tracemalloc) снимается для эндпоинтов из
+MEMORY_PROFILING_ENDPOINTS и по заголовку X-Profile-Memory от
+сотрудника. tracemalloc видит выделения всех потоков процесса, поэтому
+одновременно в процессе снимается не больше одного профиля памяти.
+"""
+import cProfile
+import marshal
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+
+from config.middleware import QueryTimer
+
+from .models import AllocationProfile, RequestProfile
+
+HEADER = 'HTTP_X_PROFILE'
+MEMORY_HEADER = 'HTTP_X_PROFILE_MEMORY'
+# Сколько строк кода с наибольшим объёмом памяти сохраняется в профиле.
+MEMORY_TOP_LINES = 50
+MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+memory_lock = threading.Lock()
+
+
+def requested(request, is_staff):
+    """is_staff вызывается, только если пришёл заголовок X-Profile."""
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        return True
+    return bool(request.META.get(HEADER)) and is_staff()
+
+
+def memory_requested(request, endpoint, is_staff):
+    if endpoint in settings.MEMORY_PROFILING_ENDPOINTS:
+        return True
+    return bool(request.META.get(MEMORY_HEADER)) and is_staff()
+
+
+def render(response):
+    # Ответ DRF рендерится после вьюхи, а JSON — тоже работа.
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def profile(request, endpoint, get_user, call):
+    """Выполняет call под профилировщиком и сохраняет профиль.
+
+    get_user возвращает пользователя, определённого при обработке call.
+    """
+    profiler = cProfile.Profile()
+    timer = QueryTimer()
+    started = time.perf_counter()
+    with timer.installed():
+        profiler.enable()
+        try:
+            response = render(call())
+        finally:
+            profiler.disable()
+    duration = time.perf_counter() - started
+    profiler.create_stats()
+    user = get_user()
+    saved = RequestProfile.objects.create(
+        endpoint=endpoint,
+        method=request.method,
+        path=request.path[:500],
+        query_string=request.META.get('QUERY_STRING', ''),
+        user_id=user.id if user.is_authenticated else None,
+        status_code=response.status_code,
+        duration=duration,
+        db_time=timer.seconds,
+        query_count=timer.count,
+        stats=marshal.dumps(profiler.stats),
+    )
+    response['X-Profile-Id'] = str(saved.id)
+    return response
+
+
+def profile_memory(request, endpoint, get_user, call):
+    """Выполняет call под tracemalloc и сохраняет профиль памяти."""
+    if tracemalloc.is_tracing() or not memory_lock.acquire(blocking=False):
+        return call()
+    try:
+        started = time.perf_counter()
+        tracemalloc.start()
+        try:
+            response = render(call())
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        duration = time.perf_counter() - started
+    finally:
+        memory_lock.release()
+    statistics = snapshot.filter_traces(MEMORY_FILTERS).statistics('lineno')
+    user = get_user()
+    saved = AllocationProfile.objects.create(
+        endpoint=endpoint,
+        method=request.method,
+        path=request.path[:500],
+        query_string=request.META.get('QUERY_STRING', ''),
+        user_id=user.id if user.is_authenticated else None,
+        status_code=response.status_code,
+        duration=duration,
+        peak=peak,
+        net=sum(stat.size for stat in statistics),
+        top=[
+            [
+                stat.traceback[0].filename,
+                stat.traceback[0].lineno,
+                stat.size,
+                stat.count,
+            ]
+            for stat in statistics[:MEMORY_TOP_LINES]
+        ],
+    )
+    response['X-Allocation-Profile-Id'] = str(saved.id)
+    return response
+
+
+def load_stats(profiles, stream=None):
+    """Складывает статистику профилей в один объект pstats.Stats."""
+    total = pstats.Stats(stream=stream)
+    for blob in profiles:
+        part = pstats.Stats(stream=stream)
+        part.stats = marshal.loads(blob)
+        part.get_top_level_stats()
+        total.add(part)
+    return total
@@ -1,14 +1,54 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db.models import Count, OuterRef, Subquery
+from django.utils.functional import cached_property
 
+from .constants import ADMIN_ESTIMATED_COUNT_THRESHOLD
 from .models import (Favorite, Follow, Ingredient, Recipe, RecipeIngredient,
                      ShoppingCart, Tag, User)
+from .utils import estimate_row_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для списка без фильтров берёт число строк из статистики базы."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if (
+                estimate is not None
+                and estimate > ADMIN_ESTIMATED_COUNT_THRESHOLD
+            ):
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без точного подсчёта строк всей таблицы."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+def count_subquery(model, field):
+    """Число связанных строк, считаемое только для строк страницы."""
+    return Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).values(
+            field
+        ).annotate(count=Count('*')).values('count')
+    )
 
 
 @admin.register(User)
 class Admin(UserAdmin):
     """Настройка отображения пользователей в админке."""
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     list_display = ('id', 'email', 'username', 'first_name', 'last_name',
                     'is_staff')
     list_display_links = ('email',)
@@ -35,39 +75,47 @@ class Admin(UserAdmin):
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdmin):
     """Настройки админки для ингредиентов рецепта."""
 
     list_display = ('recipe', 'ingredient', 'amount')
-    list_filter = ('recipe', 'ingredient')
+    list_select_related = ('recipe', 'ingredient')
+    search_fields = ('recipe__name', 'ingredient__name')
+    autocomplete_fields = ('recipe', 'ingredient')
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     """Настройки админки для ингредиентов."""
 
-    list_display = ('id', 'name', 'measurement_unit')
+    list_display = ('id', 'name', 'measurement_unit', 'usage_count')
     search_fields = ('name',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     """Настройки админки для рецептов."""
 
-    list_display = ('id', 'name', 'author',)
+    list_display = ('id', 'name', 'author', 'favorites_count')
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username', 'author__email')
     list_filter = ('tags',)
-    filter_horizontal = ('ingredients',)
+    autocomplete_fields = ('author', 'tags')
+    readonly_fields = ('favorites_count',)
     inlines = [RecipeIngredientInline]
 
     def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.select_related(
-            'author'
-        ).prefetch_related('ingredients', 'tags')
+        return super().get_queryset(request).annotate(
+            favorites_count=count_subquery(Favorite, 'recipe')
+        )
+
+    @admin.display(description='В избранном')
+    def favorites_count(self, obj):
+        return obj.favorites_count or 0
 
 
 @admin.register(Tag)
@@ -79,21 +127,30 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     """Настройки админки для избранного."""
 
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     """Настройки админки для корзины покупок."""
 
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     """Настройки админки для подписок."""
 
     list_display = ('id', 'user', 'following')
+    list_select_related = ('user', 'following')
+    search_fields = ('user__email', 'following__email')
+    autocomplete_fields = ('user', 'following')
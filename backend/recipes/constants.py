@@ -1,3 +1,37 @@
 USERNAME_MAX_LENGTH = 150
 EMAIL_MAX_LENGTH = 254
 NAME_MAX_LENGTH = 150
+
+# Авторы, у которых подписчиков больше этого числа, не раскладывают новые
+# рецепты по лентам подписчиков: их рецепты подмешиваются в ленту при чтении.
+FEED_FANOUT_LIMIT = 1000
+# Сколько последних рецептов автора добавляется в ленту при подписке.
+FEED_BACKFILL_SIZE = 50
+FEED_BATCH_SIZE = 500
+
+# Сколько похожих рецептов хранится для каждого рецепта.
+SIMILAR_RECIPES_COUNT = 10
+# Сколько строк матрицы рецепт × ингредиент обрабатывается за один проход.
+SIMILARITY_BLOCK_SIZE = 500
+
+# Сколько рецептов максимум возвращает поиск по имеющимся ингредиентам.
+PANTRY_MAX_RESULTS = 500
+
+# Популярность рецепта затухает вдвое за это время.
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_CART_WEIGHT = 1.5
+# Как часто переносится начало отсчёта популярности.
+TRENDING_RESCALE_HOURS = 24
+
+# Списки в админке длиннее этого показывают примерное число строк.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Списки API длиннее этого показывают примерное число строк по оценке
+# планировщика PostgreSQL.
+API_ESTIMATED_COUNT_THRESHOLD = 50000
+# Сколько секунд хранится число строк отфильтрованного списка.
+COUNT_CACHE_TIMEOUT = 600
+
+# Запросы короче этого ищутся только по началу слов, без похожести.
+INGREDIENT_FUZZY_MIN_LENGTH = 3
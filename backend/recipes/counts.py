@@ -0,0 +1,168 @@
+"""Число строк для пагинации без COUNT(*) на каждый запрос.
+
+Число строк отфильтрованного списка кешируется по тексту SQL-запроса и
+поколениям записи таблиц, которые в нём участвуют. Поколение таблицы
+увеличивается после каждой записи в неё, поэтому закешированные числа
+устаревших поколений просто перестают читаться.
+
+Для больших списков в PostgreSQL точный подсчёт заменяется оценкой:
+для списка без фильтров — из pg_class.reltuples, для отфильтрованного —
+из плана запроса.
+
+Так же кешируются счётчики рецептов по тегам для фасетного поиска.
+
+Поколения меняются в том процессе, где прошла запись, поэтому кеш должен
+быть общим (SHARED_CACHE). С кешем в памяти процесса числа не кешируются
+и считаются на каждый запрос.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.db.models.sql import Query
+from django.db.models.sql.where import WhereNode
+
+from .constants import API_ESTIMATED_COUNT_THRESHOLD, COUNT_CACHE_TIMEOUT
+from .models import Recipe, Tag
+from .utils import estimate_row_count
+
+RecipeTag = Recipe.tags.through
+
+no_cache = DummyCache('counts', {})
+
+
+def store():
+    return cache if settings.SHARED_CACHE else no_cache
+
+
+def generation_key(table):
+    return f'write-generation:{table}'
+
+
+def bump(*models):
+    """Отмечает запись в таблицы моделей после коммита транзакции."""
+    tables = {model._meta.db_table for model in models}
+    transaction.on_commit(lambda: bump_tables(tables))
+
+
+def bump_tables(tables):
+    for table in tables:
+        key = generation_key(table)
+        try:
+            store().incr(key)
+        except ValueError:
+            # Начальное значение из времени не совпадёт с поколением,
+            # которое было до вытеснения ключа из кеша.
+            store().set(key, time.time_ns(), None)
+
+
+def generations(tables):
+    keys = [generation_key(table) for table in sorted(tables)]
+    values = store().get_many(keys)
+    if len(values) < len(keys):
+        for key in keys:
+            if key not in values:
+                store().add(key, time.time_ns(), None)
+        values = store().get_many(keys)
+    return [values.get(key) for key in keys]
+
+
+def subqueries(node):
+    """Подзапросы в условии или выражении."""
+    if isinstance(node, Query):
+        yield node
+        return
+    if isinstance(node, WhereNode):
+        children = node.children
+    elif hasattr(node, 'get_source_expressions'):
+        children = node.get_source_expressions()
+    else:
+        return
+    for child in children:
+        yield from subqueries(child)
+
+
+def query_tables(query):
+    """Таблицы запроса, включая таблицы подзапросов."""
+    tables = set()
+    pending = [query]
+    while pending:
+        query = pending.pop()
+        tables.add(query.model._meta.db_table)
+        tables.update(join.table_name for join in query.alias_map.values())
+        for node in (query.where, *query.annotation_select.values()):
+            pending.extend(subqueries(node))
+    return tables
+
+
+def planner_estimate(queryset):
+    """Число строк запроса по плану PostgreSQL."""
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate(queryset):
+    """Оценка числа строк, если список большой, иначе None."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    if queryset.query.where or len(queryset.query.alias_map) > 1:
+        rows = planner_estimate(queryset)
+    else:
+        rows = estimate_row_count(queryset.model, queryset.db)
+    if rows is None or rows <= API_ESTIMATED_COUNT_THRESHOLD:
+        return None
+    return rows
+
+
+def signature_key(prefix, queryset, models=()):
+    """Ключ кеша для результата запроса к queryset.
+
+    Зависит от SQL и поколений таблиц queryset и моделей models. None,
+    если запрос заведомо пустой.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    tables = query_tables(queryset.query)
+    tables.update(model._meta.db_table for model in models)
+    signature = repr((queryset.db, sql, params, generations(tables)))
+    return f'{prefix}:{hashlib.sha1(signature.encode()).hexdigest()}'
+
+
+def cached_count(queryset):
+    """Возвращает (число строк, оценка ли это)."""
+    # Аннотации в SELECT и сортировка на число строк не влияют.
+    queryset = queryset.order_by().values('pk')
+    key = signature_key('count', queryset)
+    if key is None:
+        return 0, False
+    cached = store().get(key)
+    if cached is not None:
+        return cached
+    rows = estimate(queryset)
+    result = (rows, True) if rows is not None else (queryset.count(), False)
+    store().set(key, result, COUNT_CACHE_TIMEOUT)
+    return result
+
+
+def tag_facets(queryset):
+    """Теги с числом рецептов queryset у каждого, одним запросом."""
+    recipe_ids = queryset.order_by().values('pk')
+    tags = Tag.objects.order_by('name').values('id', 'name', 'slug')
+    key = signature_key('tag-facets', recipe_ids, (Tag, RecipeTag))
+    if key is None:
+        return [{**tag, 'count': 0} for tag in tags]
+    facets = store().get(key)
+    if facets is None:
+        facets = list(tags.annotate(
+            count=Count('recipes', filter=Q(recipes__in=recipe_ids))
+        ))
+        store().set(key, facets, COUNT_CACHE_TIMEOUT)
+    return facets
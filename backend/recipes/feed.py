@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models import F
+
+from . import counts
+from .constants import FEED_BACKFILL_SIZE, FEED_BATCH_SIZE, FEED_FANOUT_LIMIT
+from .models import FeedEntry, Follow, Recipe, User
+
+
+def is_fanout_author(author_id):
+    """Раскладываются ли рецепты автора по лентам при публикации."""
+    return User.objects.filter(
+        pk=author_id, followers_count__lte=FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def pull_author_ids(user):
+    """Авторы из подписок пользователя, чьи рецепты читаются напрямую."""
+    return list(
+        Follow.objects.filter(
+            user_id=user.id,
+            following__followers_count__gt=FEED_FANOUT_LIMIT,
+        ).values_list('following_id', flat=True)
+    )
+
+
+def count_follower(author_id, delta):
+    """Меняет User.followers_count автора на delta.
+
+    Возвращает True, если автор при этом вернулся к раскладке рецептов
+    по лентам: рецепты, опубликованные, пока их читали напрямую, в ленты
+    не попали, и их нужно добавить задачей backfill_followers.
+    """
+    with transaction.atomic():
+        User.objects.filter(pk=author_id).update(
+            followers_count=F('followers_count') + delta
+        )
+        count = User.objects.filter(pk=author_id).values_list(
+            'followers_count', flat=True
+        ).first()
+    return delta < 0 and count == FEED_FANOUT_LIMIT
+
+
+def fan_out_recipe(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if not is_fanout_author(recipe.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        following_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=follower_id,
+                recipe_id=recipe.id,
+                author_id=recipe.author_id,
+                created=recipe.created,
+            )
+            for follower_id in follower_ids.iterator()
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    counts.bump(FeedEntry)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if not is_fanout_author(author_id):
+        return
+    recipes = Recipe.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'created')[:FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                created=created,
+            )
+            for recipe_id, created in recipes
+        ],
+        ignore_conflicts=True,
+    )
+    counts.bump(FeedEntry)
+
+
+def prune(user_id, author_id):
+    """Убирает рецепты автора из ленты после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    counts.bump(FeedEntry)
+
+
+def backfill_followers(author_id):
+    """Добавляет последние рецепты автора в ленты всех подписчиков."""
+    follower_ids = Follow.objects.filter(
+        following_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in follower_ids.iterator():
+        backfill(user_id, author_id)
@@ -0,0 +1,127 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from api import loadgen
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class RandomFile(File):
+    """Файл из случайных байт, который читается частями и не лежит
+    в памяти целиком; попутно считает хеш прочитанного."""
+
+    def __init__(self, size):
+        super().__init__(None, name='check.bin')
+        self.size = size
+        self.position = 0
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        left = self.size - self.position
+        if size is None or size < 0 or size > left:
+            size = left
+        data = os.urandom(size)
+        self.position += size
+        self.digest.update(data)
+        return data
+
+    def chunks(self, chunk_size=None):
+        while data := self.read(chunk_size or CHUNK_SIZE):
+            yield data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if offset or whence != os.SEEK_SET:
+            raise OSError('Можно вернуться только в начало файла')
+        self.position = 0
+        self.digest = hashlib.sha256()
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет медиахранилище: загружает тестовый файл, читает его '
+        'обратно, сверяет содержимое и удаляет'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size-mb', type=float, default=1,
+            help='Размер тестового файла; больше S3_MULTIPART_THRESHOLD_MB '
+                 '— проверка многочастной загрузки',
+        )
+        parser.add_argument(
+            '--stand-in', action='store_true',
+            help='Проверить настройки s3 на локальном S3-совместимом '
+                 'сервере (moto) вместо настоящего хранилища',
+        )
+
+    def handle(self, *args, **options):
+        size = int(options['size_mb'] * 1024 * 1024)
+        if not options['stand_in']:
+            self.stdout.write(f'Хранилище: {settings.MEDIA_STORAGE}')
+            self.round_trip(default_storage, size)
+            return
+        try:
+            from moto.server import ThreadedMotoServer
+        except ImportError:
+            raise CommandError(
+                'Для --stand-in нужен moto: pip install "moto[server]"'
+            )
+        port = loadgen.free_port()
+        server = ThreadedMotoServer(port=port, verbose=False)
+        server.start()
+        try:
+            storage = self.stand_in_storage(f'http://127.0.0.1:{port}')
+            self.stdout.write(f'Хранилище: s3 (moto на порту {port})')
+            self.round_trip(storage, size)
+        finally:
+            server.stop()
+
+    def stand_in_storage(self, endpoint_url):
+        backend = settings.MEDIA_STORAGE_BACKENDS['s3']
+        options = {
+            **backend['OPTIONS'],
+            'endpoint_url': endpoint_url,
+            'region_name': 'us-east-1',
+            'access_key': 'stand-in',
+            'secret_key': 'stand-in',
+            'custom_domain': None,
+        }
+        storage = import_string(backend['BACKEND'])(**options)
+        storage.connection.meta.client.create_bucket(
+            Bucket=storage.bucket_name
+        )
+        return storage
+
+    def round_trip(self, storage, size):
+        source = RandomFile(size)
+        name = storage.save('checks/check.bin', source)
+        try:
+            digest = hashlib.sha256()
+            with storage.open(name) as file:
+                for chunk in file.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+            if digest.hexdigest() != source.digest.hexdigest():
+                raise CommandError(
+                    f'Содержимое {name} не совпадает с загруженным'
+                )
+            if storage.size(name) != size:
+                raise CommandError(f'Размер {name} не совпадает')
+            self.stdout.write(f'Загружен и прочитан {name}: {size} байт')
+            self.stdout.write(f'Ссылка: {storage.url(name)}')
+        finally:
+            storage.delete(name)
+        if storage.exists(name):
+            raise CommandError(f'{name} не удалился')
+        self.stdout.write(self.style.SUCCESS('Хранилище работает'))
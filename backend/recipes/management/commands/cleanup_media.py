@@ -0,0 +1,73 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe, User
+
+# Поля с файлами и каталоги хранилища, куда они загружаются.
+FILE_FIELDS = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
+
+
+def iter_files(storage, path):
+    """Обходит каталог хранилища, не собирая список файлов целиком."""
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from iter_files(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из медиахранилища картинки рецептов и аватары, '
+        'на которые не ссылается ни одна запись'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help='Не трогать файлы моложе этого возраста',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что и сколько места можно освободить',
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        deadline = timezone.now() - timedelta(hours=options['grace_hours'])
+        checked = orphaned = reclaimed = 0
+        for model, field_name in FILE_FIELDS:
+            upload_to = model._meta.get_field(field_name).upload_to
+            directory = upload_to.rstrip('/')
+            if not storage.exists(directory):
+                continue
+            # Имена загружаются до обхода хранилища: файл, привязанный
+            # позже, моложе grace-периода и всё равно пропускается.
+            referenced = set(model.objects.exclude(
+                **{field_name: ''}
+            ).values_list(field_name, flat=True).iterator())
+            for name in iter_files(storage, directory):
+                checked += 1
+                if name in referenced:
+                    continue
+                if storage.get_modified_time(name) > deadline:
+                    continue
+                size = storage.size(name)
+                orphaned += 1
+                reclaimed += size
+                if options['dry_run']:
+                    self.stdout.write(f'{name} ({size} байт)')
+                else:
+                    storage.delete(name)
+        action = 'Можно удалить' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено файлов: {checked}. {action}: {orphaned}, '
+            f'{reclaimed} байт ({reclaimed / 1024 / 1024:.1f} МБ)'
+        ))
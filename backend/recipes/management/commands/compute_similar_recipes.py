@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from recipes import similarity
+from recipes.constants import SIMILARITY_BLOCK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие рецепты по совпадению ингредиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe',
+            type=int,
+            action='append',
+            default=[],
+            help='Пересчитать только указанные рецепты',
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=SIMILARITY_BLOCK_SIZE,
+            help='Сколько рецептов обрабатывать за один проход',
+        )
+
+    def handle(self, *args, **options):
+        if options['recipe']:
+            similarity.refresh(options['recipe'])
+            processed = len(options['recipe'])
+        else:
+            processed = similarity.rebuild(options['block_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано рецептов: {processed}')
+        )
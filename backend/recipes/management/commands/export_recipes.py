@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipes import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает рецепты с тегами, ингредиентами и путями к картинкам '
+        'в JSONL, по рецепту на строку'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл или - для stdout')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную выгрузку с контрольной точки',
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            for batch in transfer.export_batches(
+                batch_size=options['batch_size']
+            ):
+                sys.stdout.writelines(map(transfer.dump, batch))
+            return
+        checkpoint = transfer.Checkpoint(f'{options["output"]}.checkpoint')
+        state = {'last_id': 0, 'offset': 0, 'count': 0}
+        mode = 'wb'
+        if options['resume']:
+            state = checkpoint.load() or state
+            mode = 'r+b' if state['offset'] else 'wb'
+        with open(options['output'], mode) as file:
+            file.seek(state['offset'])
+            file.truncate()
+            for batch in transfer.export_batches(
+                state['last_id'], options['batch_size']
+            ):
+                file.writelines(
+                    transfer.dump(record).encode() for record in batch
+                )
+                file.flush()
+                state = {
+                    'last_id': batch[-1]['id'],
+                    'offset': file.tell(),
+                    'count': state['count'] + len(batch),
+                }
+                checkpoint.save(**state)
+                self.stdout.write(f'Выгружено рецептов: {state["count"]}')
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка завершена, рецептов: {state["count"]}'
+        ))
@@ -0,0 +1,106 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import transfer
+from recipes.models import User
+
+REQUIRED_FIELDS = (
+    'author', 'name', 'text', 'cooking_time', 'created', 'tags',
+    'ingredients',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает рецепты из JSONL, созданного export_recipes. '
+        'Прерванную загрузку можно продолжить повторным запуском'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--default-author',
+            help='Email автора для рецептов, чьих авторов нет в базе',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не учитывая контрольную точку',
+        )
+        parser.add_argument(
+            '--no-index', action='store_true',
+            help='Не добавлять рецепты в индекс поиска, ленты и похожие '
+                 'рецепты; потом понадобятся rebuild_pantry_index, '
+                 'rebuild_feed и compute_similar_recipes',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            importer = transfer.Importer(
+                options['default_author'],
+                index=not options['no_index'],
+                warn=self.stderr.write,
+            )
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["default_author"]} не найден'
+            )
+        checkpoint = transfer.DatabaseCheckpoint(options['input'])
+        state = {'offset': 0, 'line': 0, 'created': 0, 'skipped': 0}
+        if options['restart']:
+            checkpoint.clear()
+        state = checkpoint.load() or state
+        if state['offset']:
+            self.stdout.write(f'Продолжение со строки {state["line"] + 1}')
+        with open(options['input'], 'rb') as file:
+            file.seek(state['offset'])
+            offset, line_number, batch = state['offset'], state['line'], []
+            for line in file:
+                offset += len(line)
+                line_number += 1
+                record = self.parse(line, line_number)
+                if record is None:
+                    state['skipped'] += 1
+                else:
+                    batch.append(record)
+                if len(batch) >= options['batch_size']:
+                    state.update(offset=offset, line=line_number)
+                    self.flush(importer, batch, state, checkpoint)
+                    batch = []
+            state.update(offset=offset, line=line_number)
+            self.flush(importer, batch, state, checkpoint)
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка завершена: создано {state["created"]}, '
+            f'пропущено {state["skipped"]}'
+        ))
+
+    def parse(self, line, line_number):
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            self.stderr.write(f'Строка {line_number}: некорректный JSON')
+            return None
+        missing = [field for field in REQUIRED_FIELDS if field not in record]
+        if missing:
+            self.stderr.write(
+                f'Строка {line_number}: нет полей {", ".join(missing)}'
+            )
+            return None
+        return record
+
+    def flush(self, importer, batch, state, checkpoint):
+        with transaction.atomic():
+            created = importer.import_batch(batch) if batch else 0
+            state['created'] += created
+            state['skipped'] += len(batch) - created
+            checkpoint.save(**state)
+        if batch:
+            self.stdout.write(
+                f'Создано рецептов: {state["created"]}, '
+                f'пропущено: {state["skipped"]}'
+            )
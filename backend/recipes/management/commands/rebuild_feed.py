@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipes import feed
+from recipes.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок по текущим подпискам'
+
+    def handle(self, *args, **kwargs):
+        FeedEntry.objects.all().delete()
+        follows = Follow.objects.values_list('user_id', 'following_id')
+        for count, (user_id, author_id) in enumerate(
+            follows.iterator(), start=1
+        ):
+            feed.backfill(user_id, author_id)
+            if count % 1000 == 0:
+                self.stdout.write(f'Обработано подписок: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Лента пересобрана, записей: {FeedEntry.objects.count()}'
+        ))
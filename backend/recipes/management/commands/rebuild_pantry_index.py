@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes import pantry
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает индекс рецептов по ингредиентам'
+
+    def handle(self, *args, **kwargs):
+        count = pantry.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Индекс пересобран, ингредиентов: {count}')
+        )
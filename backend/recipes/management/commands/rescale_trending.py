@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит начало отсчёта популярности рецептов на текущий момент. '
+        'Периодически это делает задача rescale_trending в run_tasks'
+    )
+
+    def handle(self, *args, **kwargs):
+        factor = trending.rescale()
+        self.stdout.write(
+            self.style.SUCCESS(f'Популярность умножена на {factor:.6g}')
+        )
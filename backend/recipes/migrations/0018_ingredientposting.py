@@ -0,0 +1,26 @@
+# Generated by Django 4.2.19 on 2026-10-19 09:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_recipeneighbor_recipeneighbor_unique_recipe_neighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPosting',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='posting', serialize=False, to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('recipe_ids', models.BinaryField(default=bytes, verbose_name='Id рецептов')),
+                ('sizes', models.BinaryField(default=bytes, verbose_name='Число ингредиентов в рецептах')),
+            ],
+            options={
+                'verbose_name': 'Рецепты ингредиента',
+                'verbose_name_plural': 'Индекс рецептов по ингредиентам',
+            },
+        ),
+    ]
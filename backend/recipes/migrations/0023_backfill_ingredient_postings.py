@@ -0,0 +1,45 @@
+# Generated by Django 4.2.19 on 2026-10-19 11:02
+
+from array import array
+from collections import Counter
+
+from django.db import migrations
+
+
+def backfill_postings(apps, schema_editor):
+    IngredientPosting = apps.get_model('recipes', 'IngredientPosting')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    sizes = Counter(
+        RecipeIngredient.objects.values_list('recipe_id', flat=True)
+        .iterator(chunk_size=10000)
+    )
+    postings = {}
+    pairs = RecipeIngredient.objects.order_by(
+        'ingredient_id', 'recipe_id'
+    ).values_list('ingredient_id', 'recipe_id')
+    for ingredient_id, recipe_id in pairs.iterator(chunk_size=10000):
+        recipe_ids, recipe_sizes = postings.setdefault(
+            ingredient_id, (array('q'), array('H'))
+        )
+        recipe_ids.append(recipe_id)
+        recipe_sizes.append(sizes[recipe_id])
+    IngredientPosting.objects.all().delete()
+    IngredientPosting.objects.bulk_create([
+        IngredientPosting(
+            ingredient_id=ingredient_id,
+            recipe_ids=recipe_ids.tobytes(),
+            sizes=recipe_sizes.tobytes(),
+        )
+        for ingredient_id, (recipe_ids, recipe_sizes) in postings.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0022_user_followers_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_postings, migrations.RunPython.noop),
+    ]
@@ -35,6 +35,11 @@ class User(AbstractUser):
         blank=True,
         verbose_name='Аватар',
     )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков',
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name', 'password')
@@ -79,6 +84,11 @@ class Ingredient(models.Model):
         max_length=64,
         verbose_name='Единица измерения'
     )
+    usage_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В рецептах',
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -135,6 +145,16 @@ class Recipe(models.Model):
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['author', 'created'],
+                name='recipe_author_created_idx'
+            ),
+            models.Index(
+                fields=['created', 'id'],
+                name='recipe_created_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -161,11 +181,52 @@ class RecipeIngredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент для рецепта'
         verbose_name_plural = 'Ингредиенты для рецепта'
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                name='recipeingr_recipe_ingr_idx'
+            ),
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='recipeingr_ingr_recipe_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.ingredient} ({self.amount}) для {self.recipe}'
 
 
+class IngredientPosting(models.Model):
+    """Рецепты, в которых встречается ингредиент (инвертированный индекс).
+
+    Хранит отсортированные id рецептов и число ингредиентов в каждом из них
+    в виде упакованных массивов одинаковой длины.
+    """
+
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='posting',
+        verbose_name='Ингредиент'
+    )
+    recipe_ids = models.BinaryField(
+        default=bytes,
+        verbose_name='Id рецептов'
+    )
+    sizes = models.BinaryField(
+        default=bytes,
+        verbose_name='Число ингредиентов в рецептах'
+    )
+
+    class Meta:
+        verbose_name = 'Рецепты ингредиента'
+        verbose_name_plural = 'Индекс рецептов по ингредиентам'
+
+    def __str__(self):
+        return f'Рецепты с {self.ingredient_id}'
+
+
 class UserRecipeRelation(models.Model):
     user = models.ForeignKey(
         User,
@@ -185,7 +246,7 @@ class UserRecipeRelation(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'recipe'],
-                name='unique_user_recipe'
+                name='%(class)s_unique_user_recipe'
             )
         ]
         verbose_name = 'Связь пользователь-рецепт'
@@ -194,9 +255,15 @@ class UserRecipeRelation(models.Model):
 
 class Favorite(UserRecipeRelation):
 
-    class Meta:
+    class Meta(UserRecipeRelation.Meta):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранные'
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='favorite_recipe_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} likes {self.recipe}'
@@ -204,9 +271,15 @@ class Favorite(UserRecipeRelation):
 
 class ShoppingCart(UserRecipeRelation):
 
-    class Meta:
+    class Meta(UserRecipeRelation.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='shoppingcart_recipe_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Список покупок {self.user} для {self.recipe}'
@@ -232,8 +305,158 @@ class Follow(models.Model):
                 fields=['user', 'following'], name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['following', 'user'],
+                name='follow_following_user_idx'
+            ),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
     def __str__(self):
         return f'У {self.user.username} подписка на {self.following.username}'
+
+
+class FeedEntry(models.Model):
+    """Запись в ленте подписчика о новом рецепте автора."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта'
+    )
+    created = models.DateTimeField(verbose_name='Дата создания рецепта')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created'],
+                name='feedentry_user_created_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feedentry_user_author_idx'
+            ),
+        ]
+        ordering = ['-created']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class RecipeNeighbor(models.Model):
+    """Похожий рецепт, посчитанный по совпадению ингредиентов."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+        verbose_name='Рецепт'
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbor_of',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'neighbor'], name='unique_recipe_neighbor'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='neighbor_recipe_score_idx'
+            ),
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.neighbor} похож на {self.recipe} ({self.score:.2f})'
+
+
+class TrendingScore(models.Model):
+    """Популярность рецепта с экспоненциальным затуханием.
+
+    Вклад события хранится умноженным на exp(λ·(t − epoch)), поэтому
+    порядок рецептов по score совпадает с порядком по затухшей
+    популярности в любой момент времени.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(default=0, verbose_name='Популярность')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score_idx'),
+        ]
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+
+    def __str__(self):
+        return f'{self.recipe}: {self.score:.2f}'
+
+
+class TrendingEpoch(models.Model):
+    """Момент времени, относительно которого хранится популярность."""
+
+    started = models.DateTimeField(verbose_name='Начало отсчёта')
+
+    class Meta:
+        verbose_name = 'Начало отсчёта популярности'
+        verbose_name_plural = 'Начало отсчёта популярности'
+
+    def __str__(self):
+        return f'{self.started:%Y-%m-%d %H:%M}'
+
+
+class ImportCheckpoint(models.Model):
+    """Позиция, до которой загружен файл import_recipes.
+
+    Сохраняется в одной транзакции с пачкой рецептов, поэтому после сбоя
+    загрузка продолжается с первой незафиксированной пачки.
+    """
+
+    path = models.CharField(
+        max_length=500, unique=True, verbose_name='Файл'
+    )
+    state = models.JSONField(default=dict, verbose_name='Состояние')
+
+    class Meta:
+        verbose_name = 'Контрольная точка загрузки'
+        verbose_name_plural = 'Контрольные точки загрузки'
+
+    def __str__(self):
+        return self.path
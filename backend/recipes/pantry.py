@@ -0,0 +1,226 @@
+"""Инвертированный индекс рецептов по ингредиентам для поиска ?have=.
+
+Индекс поддерживается сигналами RecipeIngredient, поэтому правки состава
+через API, админку и shell сразу попадают в него. Сериализатор рецепта
+меняет состав целиком внутри batch(), и индекс пересчитывается один раз.
+
+Каждое изменение состава блокирует и переписывает целиком массивы всех
+ингредиентов рецепта. Массив частого ингредиента (соль, вода) растёт на
+10 байт с каждым рецептом, а записи рецептов с общим ингредиентом
+выполняются по очереди, пока держится блокировка. Строки блокируются
+в порядке id, поэтому взаимных блокировок нет.
+"""
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .constants import PANTRY_MAX_RESULTS
+from .models import Ingredient, IngredientPosting, RecipeIngredient
+
+
+def decode(posting):
+    recipe_ids, sizes = array('q'), array('H')
+    recipe_ids.frombytes(bytes(posting.recipe_ids))
+    sizes.frombytes(bytes(posting.sizes))
+    return recipe_ids, sizes
+
+
+def encode(posting, recipe_ids, sizes):
+    posting.recipe_ids = recipe_ids.tobytes()
+    posting.sizes = sizes.tobytes()
+
+
+def recipe_ingredient_ids(recipe_id):
+    return set(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', flat=True))
+
+
+def sync_recipe(recipe_id, stale_ingredient_ids=()):
+    """Приводит индекс рецепта к текущему составу.
+
+    stale_ingredient_ids — ингредиенты, из которых рецепт мог уйти.
+    """
+    if recipe_id in batched_recipes():
+        return
+    update_recipe(
+        recipe_id, stale_ingredient_ids, recipe_ingredient_ids(recipe_id)
+    )
+
+
+local = threading.local()
+
+
+def batched_recipes():
+    if not hasattr(local, 'recipes'):
+        local.recipes = set()
+    return local.recipes
+
+
+@contextmanager
+def batch(recipe_id):
+    """Объединяет изменения состава рецепта в один пересчёт индекса."""
+    old_ingredient_ids = recipe_ingredient_ids(recipe_id)
+    batched_recipes().add(recipe_id)
+    try:
+        yield
+    finally:
+        batched_recipes().discard(recipe_id)
+    sync_recipe(recipe_id, old_ingredient_ids)
+
+
+def update_recipe(recipe_id, old_ingredient_ids, new_ingredient_ids):
+    """Переносит рецепт в индексе со старых ингредиентов на новые.
+
+    Заодно пересчитывает Ingredient.usage_count у ингредиентов, которые
+    рецепт получил или потерял.
+    """
+    new_ingredient_ids = set(new_ingredient_ids)
+    affected = set(old_ingredient_ids) | new_ingredient_ids
+    if not affected:
+        return
+    size = len(new_ingredient_ids)
+    with transaction.atomic():
+        IngredientPosting.objects.bulk_create(
+            [IngredientPosting(ingredient_id=pk) for pk in affected],
+            ignore_conflicts=True,
+        )
+        postings = list(IngredientPosting.objects.select_for_update().filter(
+            ingredient_id__in=affected
+        ).order_by('pk'))
+        changed = []
+        for posting in postings:
+            recipe_ids, sizes = decode(posting)
+            position = bisect_left(recipe_ids, recipe_id)
+            present = (
+                position < len(recipe_ids)
+                and recipe_ids[position] == recipe_id
+            )
+            if posting.ingredient_id in new_ingredient_ids:
+                if present:
+                    sizes[position] = size
+                else:
+                    recipe_ids.insert(position, recipe_id)
+                    sizes.insert(position, size)
+                    changed.append(posting.ingredient_id)
+            elif present:
+                del recipe_ids[position]
+                del sizes[position]
+                changed.append(posting.ingredient_id)
+            encode(posting, recipe_ids, sizes)
+        IngredientPosting.objects.bulk_update(
+            postings, ['recipe_ids', 'sizes']
+        )
+        if changed:
+            count_usage(Ingredient.objects.filter(id__in=changed))
+
+
+def add_recipes(recipe_ids):
+    """Добавляет в индекс пачку рецептов, например после загрузки.
+
+    Массив каждого затронутого ингредиента блокируется и переписывается
+    один раз на пачку, а не на каждый рецепт.
+    """
+    pairs = list(RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'recipe_id'))
+    if not pairs:
+        return
+    sizes = Counter(recipe_id for _, recipe_id in pairs)
+    recipes = defaultdict(set)
+    for ingredient_id, recipe_id in pairs:
+        recipes[ingredient_id].add(recipe_id)
+    with transaction.atomic():
+        IngredientPosting.objects.bulk_create(
+            [IngredientPosting(ingredient_id=pk) for pk in recipes],
+            ignore_conflicts=True,
+        )
+        postings = list(IngredientPosting.objects.select_for_update().filter(
+            ingredient_id__in=recipes
+        ).order_by('pk'))
+        for posting in postings:
+            recipe_ids, recipe_sizes = decode(posting)
+            for recipe_id in sorted(recipes[posting.ingredient_id]):
+                position = bisect_left(recipe_ids, recipe_id)
+                if (
+                    position < len(recipe_ids)
+                    and recipe_ids[position] == recipe_id
+                ):
+                    recipe_sizes[position] = sizes[recipe_id]
+                else:
+                    recipe_ids.insert(position, recipe_id)
+                    recipe_sizes.insert(position, sizes[recipe_id])
+            encode(posting, recipe_ids, recipe_sizes)
+        IngredientPosting.objects.bulk_update(
+            postings, ['recipe_ids', 'sizes'], batch_size=500
+        )
+        count_usage(Ingredient.objects.filter(id__in=recipes))
+
+
+def count_usage(ingredients):
+    """Считает Ingredient.usage_count по RecipeIngredient."""
+    ingredients.update(usage_count=Coalesce(Subquery(
+        RecipeIngredient.objects.filter(
+            ingredient_id=OuterRef('pk')
+        ).order_by().values('ingredient_id').annotate(
+            count=Count('recipe_id', distinct=True)
+        ).values('count')
+    ), 0))
+
+
+def rebuild():
+    """Строит индекс и Ingredient.usage_count заново по всем
+    ингредиентам рецептов."""
+    sizes = Counter(
+        RecipeIngredient.objects.values_list('recipe_id', flat=True)
+        .iterator(chunk_size=10000)
+    )
+    postings = {}
+    pairs = RecipeIngredient.objects.order_by(
+        'ingredient_id', 'recipe_id'
+    ).values_list('ingredient_id', 'recipe_id')
+    for ingredient_id, recipe_id in pairs.iterator(chunk_size=10000):
+        recipe_ids, recipe_sizes = postings.setdefault(
+            ingredient_id, (array('q'), array('H'))
+        )
+        recipe_ids.append(recipe_id)
+        recipe_sizes.append(sizes[recipe_id])
+    objs = []
+    for ingredient_id, (recipe_ids, recipe_sizes) in postings.items():
+        posting = IngredientPosting(ingredient_id=ingredient_id)
+        encode(posting, recipe_ids, recipe_sizes)
+        objs.append(posting)
+    with transaction.atomic():
+        IngredientPosting.objects.all().delete()
+        IngredientPosting.objects.bulk_create(objs, batch_size=500)
+        count_usage(Ingredient.objects.all())
+    return len(objs)
+
+
+def search(ingredient_ids, missing_max=0, limit=PANTRY_MAX_RESULTS):
+    """Id рецептов, которые можно приготовить из данных ингредиентов.
+
+    Рецептам разрешено не хватать не более missing_max ингредиентов.
+    Результат упорядочен по доле имеющихся ингредиентов.
+    """
+    hits = Counter()
+    sizes = {}
+    for posting in IngredientPosting.objects.filter(
+        ingredient_id__in=set(ingredient_ids)
+    ):
+        recipe_ids, recipe_sizes = decode(posting)
+        hits.update(recipe_ids)
+        sizes.update(zip(recipe_ids, recipe_sizes))
+    ranked = heapq.nsmallest(limit, (
+        (-found / sizes[recipe_id], sizes[recipe_id] - found, -recipe_id)
+        for recipe_id, found in hits.items()
+        if sizes[recipe_id] - found <= missing_max
+    ))
+    return [-recipe_id for _, _, recipe_id in ranked]
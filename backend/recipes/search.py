@@ -0,0 +1,71 @@
+"""Поиск ингредиентов по названию с учётом опечаток.
+
+Сначала идут названия, совпадающие с запросом, затем начинающиеся с
+него, затем те, где с запроса начинается одно из слов («молоко» в
+«сгущённое молоко»), и последними — похожие по триграммам
+(word_similarity из pg_trgm), например «малоко». Внутри группы выше
+ингредиенты, которые чаще встречаются в рецептах (usage_count), а среди
+похожих — более похожие.
+
+В PostgreSQL все условия сравнивают UPPER(name) и обслуживаются
+GIN-индексом ingredient_name_trgm_idx. В других базах похожесть не
+ищется, а начало слова — только после пробела.
+"""
+import re
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Upper
+
+from .constants import INGREDIENT_FUZZY_MIN_LENGTH
+
+EXACT, PREFIX, WORD_PREFIX, SIMILAR = range(4)
+
+
+def search_ingredients(queryset, query):
+    query = query.strip()
+    if not query:
+        return queryset
+    if connections[queryset.db].vendor != 'postgresql':
+        return rank(
+            queryset,
+            Q(name__iexact=query),
+            Q(name__istartswith=query),
+            Q(name__icontains=f' {query}'),
+        )
+    query = query.upper()
+    queryset = queryset.annotate(search_name=Upper('name'))
+    similar = similarity = None
+    if len(query) >= INGREDIENT_FUZZY_MIN_LENGTH:
+        similar = Q(search_name__trigram_word_similar=query)
+        similarity = TrigramWordSimilarity(query, 'search_name')
+    return rank(
+        queryset,
+        Q(search_name=query),
+        Q(search_name__startswith=query),
+        Q(search_name__regex=r'\m' + re.escape(query)),
+        similar,
+        similarity,
+    )
+
+
+def rank(queryset, exact, prefix, word_prefix, similar=None,
+         similarity=None):
+    condition = prefix | word_prefix
+    if similar is not None:
+        condition |= similar
+    return queryset.filter(condition).annotate(
+        search_rank=Case(
+            When(exact, then=Value(EXACT)),
+            When(prefix, then=Value(PREFIX)),
+            When(word_prefix, then=Value(WORD_PREFIX)),
+            default=Value(SIMILAR),
+            output_field=IntegerField(),
+        ),
+        similarity=Case(
+            When(prefix | word_prefix, then=Value(0.0)),
+            default=similarity or Value(0.0),
+            output_field=FloatField(),
+        ),
+    ).order_by('search_rank', F('similarity').desc(), '-usage_count', 'name')
@@ -0,0 +1,33 @@
+"""Короткие коды рецептов.
+
+Код — это первичный ключ рецепта в base62, поэтому выдача ссылки и
+переход по ней не обращаются к базе.
+"""
+import string
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+INDEX = {char: value for value, char in enumerate(ALPHABET)}
+
+
+def encode(recipe_id):
+    if recipe_id < 0:
+        raise ValueError('Идентификатор рецепта не может быть отрицательным.')
+    code = []
+    while True:
+        recipe_id, remainder = divmod(recipe_id, BASE)
+        code.append(ALPHABET[remainder])
+        if not recipe_id:
+            return ''.join(reversed(code))
+
+
+def decode(code):
+    """Возвращает идентификатор рецепта или ValueError для чужого кода."""
+    if not code:
+        raise ValueError('Пустой код.')
+    recipe_id = 0
+    for char in code:
+        if char not in INDEX:
+            raise ValueError(f'Недопустимый символ {char!r}.')
+        recipe_id = recipe_id * BASE + INDEX[char]
+    return recipe_id
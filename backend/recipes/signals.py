@@ -0,0 +1,98 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import counts, pantry, tasks, toggles, trending
+from .constants import TRENDING_CART_WEIGHT, TRENDING_FAVORITE_WEIGHT
+from .models import (Favorite, Follow, Recipe, RecipeIngredient, ShoppingCart,
+                     Tag, User)
+
+# Модели, по которым считаются строки постраничных списков API.
+COUNTED_MODELS = (Recipe, User, Follow, Favorite, ShoppingCart, Tag)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        tasks.fan_out_recipe.delay(recipe_id=instance.id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    instance.deleted_ingredient_ids = list(
+        instance.ingredient_amounts.values_list('ingredient_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    pantry.update_recipe(instance.id, instance.deleted_ingredient_ids, [])
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_changing(sender, instance, **kwargs):
+    # Ингредиент строки могли заменить, например в админке.
+    instance.previous_ingredient_id = None
+    if instance.pk is not None:
+        instance.previous_ingredient_id = RecipeIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', flat=True).first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    stale = [instance.ingredient_id]
+    if getattr(instance, 'previous_ingredient_id', None):
+        stale.append(instance.previous_ingredient_id)
+    pantry.sync_recipe(instance.recipe_id, stale)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, origin=None, **kwargs):
+    # Каскадное удаление рецептов обрабатывает recipe_deleted.
+    model = getattr(origin, 'model', type(origin))
+    if model is not RecipeIngredient:
+        return
+    pantry.sync_recipe(instance.recipe_id, [instance.ingredient_id])
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        toggles.follow_created(instance.user_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    toggles.follow_deleted(instance.user_id, instance.following_id)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        trending.bump(instance.recipe_id, TRENDING_FAVORITE_WEIGHT)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    if created:
+        trending.bump(instance.recipe_id, TRENDING_CART_WEIGHT)
+
+
+def counted_model_changed(sender, **kwargs):
+    counts.bump(sender)
+
+
+# Приёмник post_delete отключает быстрое каскадное удаление модели.
+# Избранное и покупки удаляются через toggles, а каскадом — вместе с
+# рецептом или пользователем, поколение которых и так меняется.
+for model in COUNTED_MODELS:
+    post_save.connect(counted_model_changed, sender=model)
+    if model not in (Favorite, ShoppingCart):
+        post_delete.connect(counted_model_changed, sender=model)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        counts.bump(sender)
@@ -0,0 +1,160 @@
+"""Похожие рецепты по коэффициенту Жаккара на множествах ингредиентов.
+
+Матрица рецепт × ингредиент хранится разреженно: для каждого ингредиента
+держится отсортированный массив id рецептов (столбец матрицы). Произведение
+строки на транспонированную матрицу считается сложением этих массивов,
+поэтому стоимость строки пропорциональна числу общих ингредиентов,
+а не размеру каталога. Строки обрабатываются блоками, и для каждого блока
+отдельным запросом загружаются только столбцы его ингредиентов. Память
+ограничена этими столбцами, а не всей матрицей, но столбец частого
+ингредиента (соль, вода) близок по длине к числу рецептов.
+"""
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+
+from .constants import SIMILAR_RECIPES_COUNT, SIMILARITY_BLOCK_SIZE
+from .models import Recipe, RecipeIngredient, RecipeNeighbor
+
+# Сколько самых похожих рецептов пересчитывают свой список соседей
+# при изменении одного рецепта.
+REFRESH_CANDIDATES = SIMILAR_RECIPES_COUNT * 10
+
+
+def jaccard(shared, size, other_size):
+    return shared / (size + other_size - shared)
+
+
+def top_neighbors(recipe_id, ingredient_ids, postings, sizes,
+                  count=SIMILAR_RECIPES_COUNT):
+    """Возвращает [(score, neighbor_id)] для одной строки матрицы."""
+    shared = Counter()
+    for ingredient_id in ingredient_ids:
+        shared.update(postings.get(ingredient_id, ()))
+    shared.pop(recipe_id, None)
+    size = len(ingredient_ids)
+    return heapq.nlargest(count, (
+        (jaccard(common, size, sizes[other_id]), other_id)
+        for other_id, common in shared.items()
+    ))
+
+
+def recipe_sizes():
+    return RecipeIngredient.objects.filter(
+        recipe=OuterRef('recipe')
+    ).values('recipe').annotate(count=Count('id')).values('count')
+
+
+def load_postings(ingredient_ids):
+    """Загружает столбцы матрицы для ингредиентов и число ингредиентов
+    каждого рецепта из этих столбцов."""
+    postings = defaultdict(lambda: array('q'))
+    sizes = {}
+    pairs = RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).annotate(size=Subquery(recipe_sizes())).order_by(
+        'ingredient_id', 'recipe_id'
+    ).values_list('ingredient_id', 'recipe_id', 'size')
+    for ingredient_id, recipe_id, size in pairs.iterator(chunk_size=10000):
+        postings[ingredient_id].append(recipe_id)
+        sizes[recipe_id] = size
+    return postings, sizes
+
+
+def iter_rows(block_size):
+    """Отдаёт строки матрицы блоками {recipe_id: [ingredient_id, ...]}."""
+    pairs = RecipeIngredient.objects.order_by(
+        'recipe_id'
+    ).values_list('recipe_id', 'ingredient_id')
+    block = {}
+    for recipe_id, items in groupby(
+        pairs.iterator(chunk_size=10000), key=lambda pair: pair[0]
+    ):
+        block[recipe_id] = [ingredient_id for _, ingredient_id in items]
+        if len(block) >= block_size:
+            yield block
+            block = {}
+    if block:
+        yield block
+
+
+def save_neighbors(neighbors):
+    """Заменяет списки соседей для рецептов из словаря."""
+    with transaction.atomic():
+        RecipeNeighbor.objects.filter(recipe_id__in=list(neighbors)).delete()
+        RecipeNeighbor.objects.bulk_create([
+            RecipeNeighbor(
+                recipe_id=recipe_id, neighbor_id=neighbor_id, score=score
+            )
+            for recipe_id, items in neighbors.items()
+            for score, neighbor_id in items
+        ])
+
+
+def rebuild(block_size=SIMILARITY_BLOCK_SIZE):
+    """Полностью пересчитывает соседей для всех рецептов."""
+    processed = 0
+    for block in iter_rows(block_size):
+        postings, sizes = load_postings({
+            ingredient_id
+            for ingredient_ids in block.values()
+            for ingredient_id in ingredient_ids
+        })
+        save_neighbors({
+            recipe_id: top_neighbors(recipe_id, ingredient_ids, postings,
+                                     sizes)
+            for recipe_id, ingredient_ids in block.items()
+        })
+        processed += len(block)
+    return processed
+
+
+def refresh(recipe_ids):
+    """Пересчитывает соседей изменившихся рецептов.
+
+    Список самого рецепта считается заново, а в списки наиболее похожих
+    на него рецептов он добавляется или обновляется. Рецепты, которые
+    перестали быть похожими, теряют его до следующего полного пересчёта.
+    """
+    for recipe_id in recipe_ids:
+        refresh_recipe(recipe_id)
+
+
+def refresh_recipe(recipe_id):
+    ingredient_ids = list(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', flat=True))
+    size = len(ingredient_ids)
+    sizes = RecipeIngredient.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('recipe').annotate(count=Count('id')).values('count')
+    candidates = Recipe.objects.filter(
+        ingredient_amounts__ingredient_id__in=ingredient_ids
+    ).exclude(pk=recipe_id).annotate(
+        shared=Count('ingredient_amounts'),
+        size=Subquery(sizes),
+    ).values_list('id', 'shared', 'size')
+    scored = heapq.nlargest(REFRESH_CANDIDATES, (
+        (jaccard(shared, size, other_size), other_id)
+        for other_id, shared, other_size in candidates.iterator()
+    ))
+    current = defaultdict(list)
+    for other_id, neighbor_id, score in RecipeNeighbor.objects.filter(
+        recipe_id__in=[other_id for _, other_id in scored]
+    ).exclude(neighbor_id=recipe_id).values_list(
+        'recipe_id', 'neighbor_id', 'score'
+    ):
+        current[other_id].append((score, neighbor_id))
+    neighbors = {recipe_id: scored[:SIMILAR_RECIPES_COUNT]}
+    for score, other_id in scored:
+        neighbors[other_id] = heapq.nlargest(
+            SIMILAR_RECIPES_COUNT,
+            current[other_id] + [(score, recipe_id)]
+        )
+    with transaction.atomic():
+        RecipeNeighbor.objects.filter(neighbor_id=recipe_id).delete()
+        save_neighbors(neighbors)
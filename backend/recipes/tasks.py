@@ -0,0 +1,35 @@
+from tasks.queue import task
+
+from . import feed, similarity, trending
+from .constants import TRENDING_RESCALE_HOURS
+from .models import Recipe
+
+
+@task()
+def refresh_similar(recipe_id):
+    if Recipe.objects.filter(pk=recipe_id).exists():
+        similarity.refresh([recipe_id])
+
+
+@task()
+def fan_out_recipe(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'id', 'author_id', 'created'
+    ).first()
+    if recipe is not None:
+        feed.fan_out_recipe(recipe)
+
+
+@task()
+def backfill_feed(user_id, author_id):
+    feed.backfill(user_id, author_id)
+
+
+@task()
+def backfill_followers(author_id):
+    feed.backfill_followers(author_id)
+
+
+@task(every=TRENDING_RESCALE_HOURS * 3600)
+def rescale_trending():
+    trending.rescale()
@@ -0,0 +1,139 @@
+"""Добавление и удаление избранного, покупок и подписок одним запросом.
+
+Вставка идёт через INSERT ... ON CONFLICT DO NOTHING, поэтому повторный
+или одновременный запрос не нарушает уникальность, а просто ничего не
+вставляет. В Postgres вставка и чтение объекта для ответа объединены в
+один запрос через CTE; в остальных базах это два запроса.
+
+Сигналы post_save и post_delete при этом не отправляются, поэтому
+популярность и лента обновляются здесь явно.
+"""
+from django.db import connections, router
+
+from . import counts, feed, tasks, trending
+from .constants import TRENDING_CART_WEIGHT, TRENDING_FAVORITE_WEIGHT
+from .models import Favorite, Follow, Recipe, ShoppingCart, User
+
+TRENDING_WEIGHTS = {
+    Favorite: TRENDING_FAVORITE_WEIGHT,
+    ShoppingCart: TRENDING_CART_WEIGHT,
+}
+RECIPE_COLUMNS = ('id', 'name', 'image', 'cooking_time')
+USER_COLUMNS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'avatar'
+)
+
+
+def quote(connection, model, field=None):
+    if field is None:
+        return connection.ops.quote_name(model._meta.db_table)
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def insert(model, user_id, field, target_id, columns, extra=''):
+    """Связывает пользователя с объектом, если объект существует.
+
+    Возвращает (объект с полями columns или None, создана ли связь).
+    extra — дополнительные выражения SELECT, начиная с запятой.
+    """
+    connection = connections[router.db_for_write(model)]
+    target = model._meta.get_field(field).related_model
+    table = quote(connection, model)
+    user_column = quote(connection, model, 'user')
+    target_column = quote(connection, model, field)
+    target_table = quote(connection, target)
+    pk = quote(connection, target, target._meta.pk.name)
+    statement = (
+        f'INSERT INTO {table} ({user_column}, {target_column}) '
+        f'SELECT %s, {pk} FROM {target_table} WHERE {pk} = %s '
+        f'ON CONFLICT ({user_column}, {target_column}) DO NOTHING'
+    )
+    select = ', '.join(quote(connection, target, name) for name in columns)
+    select = f'SELECT {select}{extra}'
+    where = f'FROM {target_table} WHERE {pk} = %s'
+    if connection.vendor == 'postgresql':
+        rows = list(target.objects.db_manager(connection.alias).raw(
+            f'WITH inserted AS ({statement} RETURNING 1) {select}, '
+            f'EXISTS (SELECT 1 FROM inserted) AS created {where}',
+            [user_id, target_id, target_id],
+        ))
+        created = bool(rows) and rows[0].created
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(statement, [user_id, target_id])
+            created = cursor.rowcount == 1
+        rows = list(target.objects.db_manager(connection.alias).raw(
+            f'{select} {where}', [target_id]
+        ))
+    if created:
+        counts.bump(model)
+    return (rows[0] if rows else None), created
+
+
+def delete(model, user_id, field, target_id):
+    """Удаляет связь; возвращает True, если она была."""
+    connection = connections[router.db_for_write(model)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(connection, model)} '
+            f'WHERE {quote(connection, model, "user")} = %s '
+            f'AND {quote(connection, model, field)} = %s',
+            [user_id, target_id],
+        )
+        deleted = cursor.rowcount > 0
+    if deleted:
+        counts.bump(model)
+    return deleted
+
+
+def add_recipe(model, user_id, recipe_id):
+    """Добавляет рецепт в избранное (Favorite) или покупки
+    (ShoppingCart). Возвращает (рецепт или None, добавлен ли)."""
+    recipe, created = insert(
+        model, user_id, 'recipe', recipe_id, RECIPE_COLUMNS
+    )
+    if created:
+        trending.bump(recipe_id, TRENDING_WEIGHTS[model])
+    return recipe, created
+
+
+def remove_recipe(model, user_id, recipe_id):
+    return delete(model, user_id, 'recipe', recipe_id)
+
+
+def follow(user_id, author_id):
+    """Подписывает на автора. Возвращает (автор с recipes_count или
+    None, создана ли подписка)."""
+    connection = connections[router.db_for_write(Follow)]
+    extra = (
+        f', (SELECT COUNT(*) FROM {quote(connection, Recipe)} '
+        f'WHERE {quote(connection, Recipe, "author")} = '
+        f'{quote(connection, User)}.{quote(connection, User, "id")}) '
+        f'AS recipes_count'
+    )
+    author, created = insert(
+        Follow, user_id, 'following', author_id, USER_COLUMNS, extra
+    )
+    if created:
+        follow_created(user_id, author_id)
+    return author, created
+
+
+def unfollow(user_id, author_id):
+    deleted = delete(Follow, user_id, 'following', author_id)
+    if deleted:
+        follow_deleted(user_id, author_id)
+    return deleted
+
+
+def follow_created(user_id, author_id):
+    """Обновляет счётчик подписчиков и ленту после подписки."""
+    feed.count_follower(author_id, 1)
+    tasks.backfill_feed.delay(user_id=user_id, author_id=author_id)
+
+
+def follow_deleted(user_id, author_id):
+    """Обновляет счётчик подписчиков и ленту после отписки."""
+    feed.prune(user_id, author_id)
+    if feed.count_follower(author_id, -1):
+        tasks.backfill_followers.delay(author_id=author_id)
@@ -0,0 +1,297 @@
+"""Перенос рецептов между окружениями в формате JSONL.
+
+Каждая строка файла — один рецепт с автором, тегами, ингредиентами и
+путём к картинке в хранилище медиафайлов. Автор задаётся email, теги —
+слагом, ингредиенты — названием, поэтому файл не зависит от id базы,
+из которой выгружен.
+"""
+import json
+import os
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, When
+from django.utils.dateparse import parse_datetime
+
+from . import counts, pantry, tasks
+from .models import (ImportCheckpoint, Ingredient, Recipe, RecipeIngredient,
+                     Tag, User)
+
+RecipeTag = Recipe.tags.through
+
+
+def export_batches(after_id=0, batch_size=1000):
+    """Выдаёт рецепты с id больше after_id пачками по возрастанию id."""
+    while True:
+        rows = list(Recipe.objects.filter(id__gt=after_id).order_by(
+            'id'
+        ).values(
+            'id', 'author__email', 'name', 'text', 'cooking_time',
+            'created', 'image',
+        )[:batch_size])
+        if not rows:
+            return
+        ids = [row['id'] for row in rows]
+        ingredients = defaultdict(list)
+        for recipe_id, name, unit, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=ids
+        ).order_by('id').values_list(
+            'recipe_id', 'ingredient__name', 'ingredient__measurement_unit',
+            'amount',
+        ):
+            ingredients[recipe_id].append(
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+            )
+        tags = defaultdict(list)
+        for recipe_id, slug, name in RecipeTag.objects.filter(
+            recipe_id__in=ids
+        ).values_list('recipe_id', 'tag__slug', 'tag__name'):
+            tags[recipe_id].append({'slug': slug, 'name': name})
+        yield [
+            {
+                'id': row['id'],
+                'author': row['author__email'],
+                'name': row['name'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+                'created': row['created'].isoformat(),
+                'image': row['image'] or None,
+                'tags': tags[row['id']],
+                'ingredients': ingredients[row['id']],
+            }
+            for row in rows
+        ]
+        after_id = ids[-1]
+
+
+def dump(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class Checkpoint:
+    """Позиция, до которой файл обработан, в отдельном JSON-файле.
+
+    Запись заменяет файл атомарно, поэтому после сбоя в нём остаётся
+    последняя зафиксированная позиция.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def save(self, **state):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class DatabaseCheckpoint:
+    """Позиция загрузки файла в базе, рядом с загруженными рецептами.
+
+    save вызывается в транзакции пачки: файловая контрольная точка,
+    записанная после коммита, при сбое между ними повторила бы пачку.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+    def load(self):
+        return ImportCheckpoint.objects.filter(
+            path=self.path
+        ).values_list('state', flat=True).first()
+
+    def save(self, **state):
+        ImportCheckpoint.objects.update_or_create(
+            path=self.path, defaults={'state': state}
+        )
+
+    def clear(self):
+        ImportCheckpoint.objects.filter(path=self.path).delete()
+
+
+class Importer:
+    """Пакетная загрузка рецептов из записей JSONL.
+
+    Теги и ингредиенты ищутся по естественным ключам в словарях, которые
+    загружаются один раз и дополняются новыми объектами. Тег с новым
+    слагом, но существующим названием связывается с существующим тегом.
+    Расхождения с базой передаются в warn по одному разу. Авторы
+    запрашиваются для каждой пачки, чтобы память не росла с числом
+    пользователей.
+
+    С index=True рецепты пачки сразу попадают в индекс поиска по
+    ингредиентам, а раскладка по лентам и пересчёт похожих рецептов
+    ставятся в очередь задач — в той же транзакции, что и сами рецепты.
+    """
+
+    def __init__(self, default_author=None, index=True, warn=None):
+        self.index = index
+        self.warn = warn or (lambda message: None)
+        self.warned = set()
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {}
+        self.units = {}
+        for pk, name, unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        ):
+            self.ingredients[name] = pk
+            self.units[name] = unit
+        self.default_author_id = None
+        if default_author:
+            self.default_author_id = User.objects.get(
+                email=default_author
+            ).id
+
+    def resolve_authors(self, records):
+        return dict(User.objects.filter(
+            email__in={record['author'] for record in records}
+        ).values_list('email', 'id'))
+
+    def report(self, key, message):
+        if key not in self.warned:
+            self.warned.add(key)
+            self.warn(message)
+
+    def add_missing_tags(self, records):
+        missing = {
+            tag['slug']: tag['name']
+            for record in records for tag in record['tags']
+            if tag['slug'] not in self.tags
+        }
+        if not missing:
+            return
+        # Названия тегов тоже уникальны.
+        existing = set(Tag.objects.filter(
+            name__in=missing.values()
+        ).values_list('name', flat=True))
+        Tag.objects.bulk_create(
+            [
+                Tag(slug=slug, name=name) for slug, name in missing.items()
+                if name not in existing
+            ],
+            ignore_conflicts=True,
+        )
+        by_name = dict(Tag.objects.filter(
+            name__in=missing.values()
+        ).values_list('name', 'id'))
+        self.tags.update(
+            Tag.objects.filter(slug__in=missing).values_list('slug', 'id')
+        )
+        for slug, name in missing.items():
+            if slug not in self.tags:
+                self.tags[slug] = by_name[name]
+                self.report(('tag', slug), (
+                    f'Тег {slug}: тег «{name}» уже есть с другим слагом, '
+                    f'рецепты связаны с ним'
+                ))
+
+    def check_units(self, records):
+        for record in records:
+            for item in record['ingredients']:
+                unit = self.units.get(item['name'])
+                if unit is not None and unit != item['measurement_unit']:
+                    self.report(('unit', item['name']), (
+                        f'Ингредиент «{item["name"]}»: в файле единица '
+                        f'«{item["measurement_unit"]}», в базе «{unit}»; '
+                        f'количества загружены без пересчёта'
+                    ))
+
+    def add_missing_ingredients(self, records):
+        missing = {
+            item['name']: item['measurement_unit']
+            for record in records for item in record['ingredients']
+            if item['name'] not in self.ingredients
+        }
+        if not missing:
+            return
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in missing.items()
+            ],
+            ignore_conflicts=True,
+        )
+        for pk, name, unit in Ingredient.objects.filter(
+            name__in=missing
+        ).values_list('id', 'name', 'measurement_unit'):
+            self.ingredients[name] = pk
+            self.units[name] = unit
+
+    def import_batch(self, records):
+        """Создаёт рецепты пачки в одной транзакции.
+
+        Возвращает число созданных рецептов; записи с неизвестным
+        автором пропускаются, если не задан автор по умолчанию.
+        """
+        with transaction.atomic():
+            authors = self.resolve_authors(records)
+            records = [
+                record for record in records
+                if record['author'] in authors or self.default_author_id
+            ]
+            if not records:
+                return 0
+            self.add_missing_tags(records)
+            self.add_missing_ingredients(records)
+            self.check_units(records)
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=authors.get(
+                        record['author'], self.default_author_id
+                    ),
+                    name=record['name'],
+                    text=record['text'],
+                    cooking_time=record['cooking_time'],
+                    image=record['image'] or '',
+                )
+                for record in records
+            ])
+            # bulk_create заполняет auto_now_add текущим временем.
+            Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in recipes]
+            ).update(created=Case(*(
+                When(pk=recipe.pk, then=parse_datetime(record['created']))
+                for recipe, record in zip(recipes, records)
+            )))
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe_id=recipe.pk,
+                    ingredient_id=self.ingredients[item['name']],
+                    amount=item['amount'],
+                )
+                for recipe, record in zip(recipes, records)
+                for item in record['ingredients']
+            )
+            # Один тег может встретиться в записи дважды, в том числе
+            # под разными слагами с одним названием.
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, record in zip(recipes, records)
+                for tag_id in dict.fromkeys(
+                    self.tags[tag['slug']] for tag in record['tags']
+                )
+            )
+            counts.bump(Recipe, RecipeTag, Tag)
+            if self.index:
+                self.index_recipes([recipe.pk for recipe in recipes])
+        return len(recipes)
+
+    def index_recipes(self, recipe_ids):
+        # bulk_create не отправляет сигналы, которые делают это для
+        # рецептов из API.
+        pantry.add_recipes(recipe_ids)
+        for recipe_id in recipe_ids:
+            tasks.fan_out_recipe.delay(recipe_id=recipe_id)
+            tasks.refresh_similar.delay(
+                recipe_id=recipe_id, dedup_key=f'similar:{recipe_id}'
+            )
@@ -0,0 +1,79 @@
+import math
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counts
+from .constants import TRENDING_HALF_LIFE_HOURS
+from .models import TrendingEpoch, TrendingScore
+
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+# Рецепты с популярностью ниже этого значения удаляются при переносе.
+MIN_SCORE = 1e-3
+
+
+def get_epoch():
+    epoch, _ = TrendingEpoch.objects.select_for_update().get_or_create(
+        pk=1, defaults={'started': timezone.now()}
+    )
+    return epoch
+
+
+def shared_epoch():
+    """Начало отсчёта с разделяемой блокировкой до конца транзакции.
+
+    В PostgreSQL это SELECT ... FOR SHARE: события не ждут друг друга, а
+    rescale ждёт, пока они завершатся.
+    """
+    db = router.db_for_write(TrendingEpoch)
+    lock = ' FOR SHARE' if connections[db].vendor == 'postgresql' else ''
+    epoch = next(iter(TrendingEpoch.objects.db_manager(db).raw(
+        f'SELECT id, started FROM {TrendingEpoch._meta.db_table} '
+        f'WHERE id = %s{lock}', [1]
+    )), None)
+    return epoch or get_epoch()
+
+
+def bump(recipe_id, weight):
+    """Добавляет к популярности рецепта событие с весом weight.
+
+    Начало отсчёта остаётся заблокированным до конца транзакции, иначе
+    rescale мог бы перенести его между чтением и обновлением и прибавка
+    оказалась бы посчитана от старого начала.
+    """
+    with transaction.atomic():
+        elapsed = (timezone.now() - shared_epoch().started).total_seconds()
+        increment = weight * math.exp(DECAY_RATE * elapsed)
+        updated = TrendingScore.objects.filter(recipe_id=recipe_id).update(
+            score=F('score') + increment
+        )
+        if not updated:
+            _, created = TrendingScore.objects.get_or_create(
+                recipe_id=recipe_id, defaults={'score': increment}
+            )
+            if created:
+                counts.bump(TrendingScore)
+            else:
+                TrendingScore.objects.filter(recipe_id=recipe_id).update(
+                    score=F('score') + increment
+                )
+
+
+def rescale():
+    """Переносит начало отсчёта на текущий момент.
+
+    Хранимые значения растут экспоненциально со временем, поэтому
+    периодический перенос держит их в разумных пределах. Порядок
+    рецептов при этом не меняется.
+    """
+    with transaction.atomic():
+        epoch = get_epoch()
+        now = timezone.now()
+        factor = math.exp(-DECAY_RATE * (now - epoch.started).total_seconds())
+        TrendingScore.objects.update(score=F('score') * factor)
+        TrendingScore.objects.filter(score__lt=MIN_SCORE).delete()
+        counts.bump(TrendingScore)
+        epoch.started = now
+        epoch.save(update_fields=['started'])
+    return factor
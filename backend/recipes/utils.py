@@ -0,0 +1,21 @@
+from django.db import connections
+
+
+def estimate_row_count(model, using='default'):
+    """Оценка числа строк таблицы по статистике PostgreSQL.
+
+    Возвращает None, если база не PostgreSQL или таблица ещё не
+    анализировалась.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
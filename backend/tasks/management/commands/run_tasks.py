@@ -0,0 +1,74 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from tasks import queue
+
+logger = logging.getLogger('tasks')
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры, выполняющие фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2)
+        parser.add_argument(
+            '--poll', type=float, default=settings.TASKS_POLL_INTERVAL,
+            help='Пауза между проверками пустой очереди, с',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить задачи, срок которых подошёл, и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        signal.signal(signal.SIGINT, lambda *args: stop.set())
+        requeued = queue.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь задач: {requeued}')
+        queue.schedule_periodic()
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f'{prefix}:{number}', stop, options),
+            )
+            for number in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.SUCCESS('Воркеры остановлены'))
+
+    def work(self, worker, stop, options):
+        checked = time.monotonic()
+        try:
+            while not stop.is_set():
+                try:
+                    task = queue.claim(worker)
+                except DatabaseError:
+                    logger.exception('Не удалось получить задачу из очереди')
+                    connections.close_all()
+                    stop.wait(options['poll'])
+                    continue
+                if task is not None:
+                    queue.execute(task)
+                    continue
+                if options['once']:
+                    return
+                if time.monotonic() - checked > settings.TASKS_TIMEOUT:
+                    queue.requeue_stale()
+                    checked = time.monotonic()
+                stop.wait(options['poll'])
+        finally:
+            connections.close_all()
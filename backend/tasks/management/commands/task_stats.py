@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Показывает длительность и число ошибок фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        finished = Task.objects.filter(finished__gte=since)
+        rows = finished.values('name').annotate(
+            done=Count('id', filter=Q(status=Task.Status.DONE)),
+            failed=Count('id', filter=Q(status=Task.Status.FAILED)),
+            avg=Avg('duration'),
+            max=Max('duration'),
+        ).order_by('name')
+        pending = dict(
+            Task.objects.filter(status=Task.Status.PENDING).values(
+                'name'
+            ).annotate(count=Count('id')).values_list('name', 'count')
+        )
+        self.stdout.write(
+            f'{"task":40} {"done":>6} {"failed":>6} {"pending":>7} '
+            f'{"avg ms":>8} {"p95 ms":>8} {"max ms":>8}'
+        )
+        for row in rows:
+            durations = sorted(
+                finished.filter(
+                    name=row['name'], duration__isnull=False
+                ).values_list('duration', flat=True)
+            )
+            p95 = (
+                durations[int(0.95 * (len(durations) - 1))]
+                if durations else 0
+            )
+            self.stdout.write(
+                f'{row["name"][:40]:40} {row["done"]:>6} {row["failed"]:>6} '
+                f'{pending.pop(row["name"], 0):>7} '
+                f'{(row["avg"] or 0) * 1000:>8.1f} {p95 * 1000:>8.1f} '
+                f'{(row["max"] or 0) * 1000:>8.1f}'
+            )
+        for name, count in sorted(pending.items()):
+            self.stdout.write(f'{name[:40]:40} {0:>6} {0:>6} {count:>7}')
@@ -0,0 +1,69 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField(max_length=200, verbose_name='Задача')
+    kwargs = models.JSONField(default=dict, verbose_name='Аргументы')
+    dedup_key = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        verbose_name='Ключ дедупликации',
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Запустить не раньше'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3, verbose_name='Максимум попыток'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Поставлена'
+    )
+    started = models.DateTimeField(
+        null=True, blank=True, verbose_name='Начата'
+    )
+    finished = models.DateTimeField(
+        null=True, blank=True, verbose_name='Завершена'
+    )
+    duration = models.FloatField(
+        null=True, blank=True, verbose_name='Длительность, с'
+    )
+    worker = models.CharField(
+        max_length=100, blank=True, verbose_name='Воркер'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-created']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_dedup_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_queue_idx'),
+            models.Index(fields=['name', 'finished'], name='task_stats_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -0,0 +1,205 @@
+"""Очередь фоновых задач в таблице базы данных.
+
+Задача — функция, зарегистрированная декоратором task. Вьюхи ставят её
+в очередь через func.delay(...) и сразу отвечают клиенту, а выполняет
+её воркер run_tasks. При TASKS_EAGER задачи выполняются сразу после
+фиксации транзакции, без очереди.
+
+Периодические задачи (task(every=...)) ставит в очередь run_tasks при
+запуске, а после каждого выполнения задача ставится снова через every
+секунд.
+"""
+import logging
+import time
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+Registered = namedtuple('Registered', 'func max_attempts retry_delay every')
+
+registry = {}
+
+
+def task(name=None, max_attempts=3, retry_delay=30, every=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы задачи передаются именованными и должны сериализоваться
+    в JSON. Повторная попытка после ошибки откладывается на retry_delay
+    секунд, с каждой попыткой вдвое дольше. Задача с every выполняется
+    без аргументов раз в every секунд.
+    """
+
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = Registered(
+            func, max_attempts, retry_delay, every
+        )
+
+        def delay(*, dedup_key=None, run_at=None, **kwargs):
+            return enqueue(
+                task_name, kwargs, dedup_key=dedup_key, run_at=run_at
+            )
+
+        func.task_name = task_name
+        func.delay = delay
+        return func
+
+    return decorator
+
+
+def enqueue(name, kwargs=None, dedup_key=None, run_at=None):
+    """Ставит задачу в очередь.
+
+    Если в очереди уже ждёт задача с тем же dedup_key, новая не
+    создаётся и возвращается ожидающая.
+    """
+    registered = registry[name]
+    kwargs = kwargs or {}
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: registered.func(**kwargs))
+        return None
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name,
+                kwargs=kwargs,
+                dedup_key=dedup_key,
+                run_at=run_at or timezone.now(),
+                max_attempts=registered.max_attempts,
+            )
+    except IntegrityError:
+        if dedup_key is None:
+            raise
+        return Task.objects.filter(
+            dedup_key=dedup_key, status=Task.Status.PENDING
+        ).first()
+
+
+def periodic_key(name):
+    return f'periodic:{name}'
+
+
+def schedule_periodic():
+    """Ставит в очередь периодические задачи, которых в ней нет."""
+    if settings.TASKS_EAGER:
+        return
+    for name, registered in registry.items():
+        if registered.every is not None:
+            enqueue(name, dedup_key=periodic_key(name))
+
+
+def schedule_next(task, registered):
+    if registered.every is not None:
+        enqueue(
+            task.name,
+            dedup_key=periodic_key(task.name),
+            run_at=timezone.now() + timedelta(seconds=registered.every),
+        )
+
+
+def claim(worker):
+    """Забирает из очереди следующую задачу, срок которой подошёл."""
+    now = timezone.now()
+    with transaction.atomic():
+        task = Task.objects.select_for_update(skip_locked=True).filter(
+            status=Task.Status.PENDING, run_at__lte=now
+        ).order_by('run_at', 'id').first()
+        if task is None:
+            return None
+        # Без SELECT ... FOR UPDATE (SQLite) задачу может забрать другой
+        # поток, поэтому захват подтверждается условным UPDATE.
+        claimed = Task.objects.filter(
+            pk=task.pk, status=Task.Status.PENDING
+        ).update(
+            status=Task.Status.RUNNING,
+            started=now,
+            attempts=F('attempts') + 1,
+            worker=worker,
+        )
+    if not claimed:
+        return None
+    task.refresh_from_db()
+    return task
+
+
+def finish(task, **fields):
+    Task.objects.filter(pk=task.pk).update(finished=timezone.now(), **fields)
+
+
+def reschedule(task, run_at, error):
+    """Возвращает задачу в очередь, если её не заменила новая такая же."""
+    try:
+        with transaction.atomic():
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.Status.PENDING, run_at=run_at, last_error=error
+            )
+    except IntegrityError:
+        finish(
+            task,
+            status=Task.Status.FAILED,
+            last_error=error + '\nВ очереди уже есть такая же задача.',
+        )
+
+
+def execute(task):
+    """Выполняет задачу и записывает результат и длительность."""
+    registered = registry.get(task.name)
+    if registered is None:
+        finish(
+            task,
+            status=Task.Status.FAILED,
+            last_error=f'Задача {task.name} не зарегистрирована.',
+        )
+        return
+    started = time.perf_counter()
+    try:
+        registered.func(**task.kwargs)
+    except Exception:
+        duration = time.perf_counter() - started
+        error = traceback.format_exc()
+        logger.exception('Задача %s #%s завершилась ошибкой',
+                         task.name, task.pk)
+        if task.attempts < task.max_attempts:
+            delay = registered.retry_delay * 2 ** (task.attempts - 1)
+            Task.objects.filter(pk=task.pk).update(duration=duration)
+            reschedule(task, timezone.now() + timedelta(seconds=delay), error)
+        else:
+            finish(
+                task,
+                status=Task.Status.FAILED,
+                duration=duration,
+                last_error=error,
+            )
+            schedule_next(task, registered)
+        return
+    finish(
+        task,
+        status=Task.Status.DONE,
+        duration=time.perf_counter() - started,
+        last_error='',
+    )
+    schedule_next(task, registered)
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, которые не завершились."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_TIMEOUT)
+    stale = Task.objects.filter(
+        status=Task.Status.RUNNING, started__lt=deadline
+    )
+    error = 'Воркер не завершил задачу вовремя.'
+    for task in stale:
+        if task.attempts < task.max_attempts:
+            reschedule(task, timezone.now(), error)
+        else:
+            finish(task, status=Task.Status.FAILED, last_error=error)
+    return len(stale)